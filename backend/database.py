@@ -9,6 +9,8 @@ from contextlib import contextmanager
 from sqlalchemy import create_engine, Column, String, DateTime, Text, Integer, Float, Boolean, ForeignKey, Enum as SQLEnum
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session, relationship, scoped_session
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.dialects.sqlite import JSON
 from sqlalchemy.sql import func
 import enum
@@ -16,6 +18,13 @@ import enum
 # Database URL configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./virtuai_office.db")
 
+# Each connection to sqlite:///:memory: gets its own private database, so the
+# sync and async engines would never see each other's data. A named
+# shared-cache in-memory database is visible to every connection in the process
+SHARED_MEMORY_DATABASE_URL = "sqlite:///file:virtuai_office?mode=memory&cache=shared&uri=true"
+if DATABASE_URL.startswith("sqlite") and make_url(DATABASE_URL).database in (None, "", ":memory:"):
+    DATABASE_URL = SHARED_MEMORY_DATABASE_URL
+
 # Create engine with optimized settings
 if DATABASE_URL.startswith("sqlite"):
     # SQLite specific settings
@@ -42,6 +51,57 @@ else:
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Session = scoped_session(SessionLocal)
 
+# Async driver used for each database backend, whatever sync driver the URL names
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+}
+
+def get_async_database_url(database_url: str) -> URL:
+    """Rewrite a database URL to use the async driver for its backend"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend == "postgres":  # Legacy scheme alias, e.g. postgres://user@host/db
+        backend = "postgresql"
+    
+    driver = ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        raise ValueError(f"No async driver configured for database backend: {backend}")
+    
+    url = url.set(drivername=f"{backend}+{driver}")
+    if driver == "asyncpg" and "sslmode" in url.query:
+        # libpq's sslmode is spelled ssl by asyncpg
+        url = url.difference_update_query(["sslmode"]).update_query_dict({"ssl": url.query["sslmode"]})
+    return url
+
+_async_session_factory: Optional[async_sessionmaker] = None
+
+def get_async_session_factory() -> async_sessionmaker:
+    """Session factory for services that query from the event loop
+    
+    The async engine (aiosqlite / asyncpg drivers) is created on first use, so
+    backends without an async driver only fail for the services that need one.
+    """
+    global _async_session_factory
+    if _async_session_factory is None:
+        async_database_url = get_async_database_url(DATABASE_URL)
+        if async_database_url.get_backend_name() == "sqlite":
+            async_engine = create_async_engine(
+                async_database_url,
+                connect_args={"timeout": 30},
+                echo=os.getenv("SQL_DEBUG", "false").lower() == "true"
+            )
+        else:
+            async_engine = create_async_engine(
+                async_database_url,
+                pool_size=10,
+                max_overflow=40,
+                pool_pre_ping=True,
+                echo=os.getenv("SQL_DEBUG", "false").lower() == "true"
+            )
+        _async_session_factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    return _async_session_factory
+
 # Base class for all models
 Base = declarative_base()
 
@@ -516,6 +576,11 @@ def get_db() -> Session:
     finally:
         db.close()
 
+async def get_async_db():
+    """Get async database session dependency for FastAPI"""
+    async with get_async_session_factory()() as session:
+        yield session
+
 @contextmanager
 def get_db_session():
     """Context manager for database sessions"""
@@ -679,6 +744,9 @@ def migrate_database():
     # Add migration logic here as needed
     # For now, just ensure all tables exist
     init_database()
+    
+    from .orchestration.collaboration import migrate_collaboration_tables
+    migrate_collaboration_tables(engine)
 
 if __name__ == "__main__":
     print("🗄️ VirtuAI Office Database Setup")
@@ -1,21 +1,37 @@
 # VirtuAI Office - Multi-Agent Collaboration System
 import asyncio
+import functools
+import io
 import json
+import operator
+import re
+import sys
+import time
 import uuid
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Tuple, Set
+from typing import List, Dict, Any, Optional, Tuple, Set, Callable
 from enum import Enum
 from dataclasses import dataclass, field
 import logging
 
-from sqlalchemy import Column, String, DateTime, Text, Integer, Float, Boolean, ForeignKey
+from sqlalchemy import Column, String, Date, DateTime, Text, Integer, BigInteger, Float, Boolean, ForeignKey, JSON, func, inspect, text, true
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session, relationship
 
 from ..core.logging import get_logger
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 logger = get_logger('virtuai.collaboration')
 
+# dataclass(slots=True) is Python 3.10+; older interpreters keep a __dict__
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
 # Collaboration Types
 class CollaborationType(str, Enum):
     INDEPENDENT = "independent"    # Single agent task
@@ -34,7 +50,7 @@ class CollaborationStatus(str, Enum):
     CANCELLED = "cancelled"
 
 # Data Structures
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class CollaborationStep:
     agent_id: str
     agent_name: str
@@ -43,12 +59,13 @@ class CollaborationStep:
     dependencies: List[str] = field(default_factory=list)
     outputs: List[str] = field(default_factory=list)
     status: str = "pending"
-    started_at: Optional[datetime] = None
-    completed_at: Optional[datetime] = None
+    started_at_ns: Optional[int] = None  # time.time_ns() epoch timestamps
+    completed_at_ns: Optional[int] = None
     output: Optional[str] = None
+    quality_score: Optional[float] = None
     feedback: Optional[str] = None
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class CollaborationPlan:
     id: str
     primary_task_id: str
@@ -60,6 +77,13 @@ class CollaborationPlan:
     status: CollaborationStatus = CollaborationStatus.PLANNED
     context: Dict[str, Any] = field(default_factory=dict)
 
+@dataclass(**_DATACLASS_SLOTS)
+class StepTask:
+    """Task handed to an agent's process_task for a single collaboration step"""
+    title: str
+    description: str
+    priority: str = "medium"
+
 # Database Models
 Base = declarative_base()
 
@@ -73,7 +97,7 @@ class TaskCollaboration(Base):
     
     # Collaboration metadata
     plan_data = Column(Text)  # JSON serialized CollaborationPlan
-    agents_involved = Column(Text)  # JSON list of agent IDs
+    agents_involved = Column(JSON)  # List of agent IDs
     estimated_duration = Column(Float)
     actual_duration = Column(Float)
     
@@ -92,7 +116,7 @@ class TaskCollaboration(Base):
     quality_score = Column(Float)
     feedback = Column(Text)
 
-class CollaborationStep(Base):
+class CollaborationStepRecord(Base):
     __tablename__ = "collaboration_steps"
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -111,8 +135,10 @@ class CollaborationStep(Base):
     
     # Execution
     status = Column(String, default="pending")
-    started_at = Column(DateTime)
+    started_at = Column(DateTime)  # Legacy rows; new steps write the *_ns columns
     completed_at = Column(DateTime)
+    started_at_ns = Column(BigInteger)  # Epoch nanoseconds
+    completed_at_ns = Column(BigInteger)
     output = Column(Text)
     
     # Quality and feedback
@@ -120,6 +146,14 @@ class CollaborationStep(Base):
     feedback = Column(Text)
     revision_count = Column(Integer, default=0)
 
+class CollaborationEfficiency(Base):
+    __tablename__ = "collaboration_efficiency_daily"
+    
+    # Efficiency totals of the collaborations completed on each (UTC) day
+    day = Column(Date, primary_key=True)
+    efficiency_sum = Column(Float, nullable=False, default=0.0)
+    sample_count = Column(Integer, nullable=False, default=0)
+
 class AgentInteraction(Base):
     __tablename__ = "agent_interactions"
     
@@ -142,12 +176,136 @@ class AgentInteraction(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     responded_at = Column(DateTime)
 
+def migrate_collaboration_tables(engine: Engine) -> None:
+    """Create the collaboration tables and upgrade ones written by older releases
+
+    create_all never alters an existing table, so column changes made after a
+    table was first created are applied here. Safe to run repeatedly.
+    """
+    Base.metadata.create_all(bind=engine)
+    
+    inspector = inspect(engine)
+    collaboration_columns = {
+        column["name"]: column["type"]
+        for column in inspector.get_columns(TaskCollaboration.__tablename__)
+    }
+    step_columns = {column["name"] for column in inspector.get_columns(CollaborationStepRecord.__tablename__)}
+    
+    with engine.begin() as connection:
+        # agents_involved used to be JSON text; SQLite reads either, PostgreSQL needs json
+        if engine.dialect.name == "postgresql" and not isinstance(collaboration_columns["agents_involved"], JSON):
+            connection.execute(text(
+                "ALTER TABLE task_collaborations "
+                "ALTER COLUMN agents_involved TYPE JSON USING agents_involved::json"
+            ))
+        
+        # Integer nanosecond step timestamps were added alongside the DateTime columns
+        for column in (CollaborationStepRecord.started_at_ns, CollaborationStepRecord.completed_at_ns):
+            if column.name not in step_columns:
+                connection.execute(text(
+                    f"ALTER TABLE collaboration_steps ADD COLUMN {column.name} "
+                    f"{column.type.compile(dialect=engine.dialect)}"
+                ))
+
+# INSERT constructs supporting ON CONFLICT, for the efficiency upsert
+_UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+# Static prompt boilerplate written verbatim into every step context
+_CONTEXT_HEADER = (
+    "=== COLLABORATION CONTEXT ===\n"
+    "You are working on a collaborative task with other AI agents.\n"
+)
+_CONTEXT_FOOTER = (
+    "\n=== INSTRUCTIONS ===\n"
+    "Build upon the previous work and coordinate with the overall goal.\n"
+    "Provide detailed, high-quality output that the next agent can use."
+)
+_EXPECTED_OUTPUTS_HEADER = "=== EXPECTED OUTPUTS ===\nPlease provide:\n"
+_HISTORY_HEADER = "=== COLLABORATION HISTORY ==="
+
+NS_PER_HOUR = 3600 * 1_000_000_000
+
+def _timestamp_isoformat(timestamp_ns: Optional[int], fallback: Optional[datetime] = None) -> Optional[str]:
+    """Render an epoch-nanosecond timestamp (or a legacy datetime) for display"""
+    if timestamp_ns is not None:
+        return datetime.utcfromtimestamp(timestamp_ns / 1_000_000_000).isoformat()
+    return fallback.isoformat() if fallback else None
+
+def _truncate(text: str, limit: int) -> str:
+    """Return text unchanged if it fits within limit, otherwise a truncated copy"""
+    return text if len(text) <= limit else text[:limit] + "..."
+
+@functools.lru_cache(maxsize=128)
+def _expected_output_matcher(expected_outputs: Tuple[str, ...]) -> Callable[[str], int]:
+    """Build a single-pass matcher for the keywords of a set of expected outputs.
+    
+    The returned callable takes lowercased text and returns a bitmask with bit
+    ``i`` set when any keyword of ``expected_outputs[i]`` occurs in it. Uses an
+    Aho-Corasick automaton when pyahocorasick is installed and falls back to a
+    compiled regex otherwise.
+    """
+    keyword_masks: Dict[str, int] = {}
+    for index, expected in enumerate(expected_outputs):
+        for keyword in expected.replace('_', ' ').split():
+            keyword = keyword.lower()
+            keyword_masks[keyword] = keyword_masks.get(keyword, 0) | (1 << index)
+    
+    if not keyword_masks:
+        return lambda text: 0
+    
+    full_mask = (1 << len(expected_outputs)) - 1
+    
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for keyword, mask in keyword_masks.items():
+            automaton.add_word(keyword, mask)
+        automaton.make_automaton()
+        
+        def match(text: str) -> int:
+            matched = 0
+            for _, mask in automaton.iter(text):
+                matched |= mask
+                if matched == full_mask:
+                    break
+            return matched
+        
+        return match
+    
+    # The zero-width lookahead reports overlapping occurrences; with the
+    # alternation ordered longest-first, a keyword is only shadowed by a longer
+    # keyword it prefixes, so each keyword's mask also covers its prefixes.
+    ordered = sorted(keyword_masks, key=len, reverse=True)
+    pattern = re.compile("(?=(" + "|".join(map(re.escape, ordered)) + "))")
+    closed_masks = {
+        keyword: functools.reduce(
+            operator.or_, (keyword_masks[p] for p in ordered if keyword.startswith(p))
+        )
+        for keyword in ordered
+    }
+    
+    def match(text: str) -> int:
+        matched = 0
+        for keyword in set(pattern.findall(text)):
+            matched |= closed_masks[keyword]
+        return matched
+    
+    return match
+
 # Collaboration Manager
 class CollaborationManager:
     def __init__(self, agent_manager, boss_ai):
         self.agent_manager = agent_manager
         self.boss_ai = boss_ai
         self.active_collaborations: Dict[str, CollaborationPlan] = {}
+        self._summary_compilers = {
+            CollaborationType.SEQUENTIAL: self._compile_sequential_summary,
+            CollaborationType.PARALLEL: self._compile_parallel_summary,
+            CollaborationType.REVIEW: self._compile_review_summary,
+            CollaborationType.ITERATIVE: self._compile_iterative_summary
+        }
         self.collaboration_patterns = self._load_collaboration_patterns()
     
     def _load_collaboration_patterns(self) -> Dict[str, Dict]:
@@ -272,7 +430,7 @@ class CollaborationManager:
             primary_task_id=task_id,
             collaboration_type=collaboration_type.value,
             plan_data=json.dumps(self._serialize_plan(plan)),
-            agents_involved=json.dumps(list(plan.agents_involved)),
+            agents_involved=list(plan.agents_involved),
             estimated_duration=estimated_duration,
             total_steps=len(steps)
         )
@@ -281,7 +439,7 @@ class CollaborationManager:
         
         # Store individual steps
         for i, step in enumerate(steps):
-            step_record = CollaborationStep(
+            step_record = CollaborationStepRecord(
                 collaboration_id=plan_id,
                 step_order=i,
                 agent_id=step.agent_id,
@@ -604,11 +762,12 @@ class CollaborationManager:
         plan.status = CollaborationStatus.ACTIVE
         
         # Update database
+        started_at = datetime.utcnow()
         db.query(TaskCollaboration).filter(
             TaskCollaboration.id == collaboration_id
         ).update({
             "status": "active",
-            "started_at": datetime.utcnow()
+            "started_at": started_at
         })
         db.commit()
         
@@ -622,15 +781,21 @@ class CollaborationManager:
             
             # Update completion status
             plan.status = CollaborationStatus.COMPLETED
+            completed_at = datetime.utcnow()
+            actual_duration = (completed_at - started_at).total_seconds() / 3600
             
             db.query(TaskCollaboration).filter(
                 TaskCollaboration.id == collaboration_id
             ).update({
                 "status": "completed",
-                "completed_at": datetime.utcnow(),
+                "completed_at": completed_at,
+                "actual_duration": actual_duration,
                 "final_output": final_output,
                 "completed_steps": len(plan.steps)
             })
+            if actual_duration > 0 and plan.estimated_duration:
+                efficiency = min((plan.estimated_duration / actual_duration) * 100, 200)
+                self._record_collaboration_efficiency(efficiency, db)
             db.commit()
             
             logger.info(f"Collaboration {collaboration_id} completed successfully")
@@ -640,7 +805,7 @@ class CollaborationManager:
                 "status": "completed",
                 "final_output": final_output,
                 "steps_completed": len(plan.steps),
-                "total_duration": sum(step.estimated_duration for step in plan.steps if step.completed_at)
+                "total_duration": sum(step.estimated_duration for step in plan.steps if step.completed_at_ns)
             }
             
         except Exception as e:
@@ -659,69 +824,114 @@ class CollaborationManager:
             raise
     
     async def _execute_collaboration_steps(self, plan: CollaborationPlan, db: Session) -> Dict[str, Any]:
-        """Execute individual collaboration steps"""
-        
-        results = {}
-        step_outputs = {}
-        
-        if plan.collaboration_type == CollaborationType.SEQUENTIAL:
-            # Execute steps in order
-            for step in plan.steps:
-                result = await self._execute_single_step(step, step_outputs, db)
-                results[step.agent_id] = result
-                step_outputs[step.agent_id] = result.get("output", "")
-                
-        elif plan.collaboration_type == CollaborationType.PARALLEL:
-            # Execute steps concurrently (except dependencies)
-            parallel_steps = [step for step in plan.steps if not step.dependencies]
-            dependent_steps = [step for step in plan.steps if step.dependencies]
+        """Execute individual collaboration steps
+        
+        Steps run as a dependency DAG: every step whose dependencies have
+        completed is dispatched immediately, so independent steps overlap and
+        total latency follows the critical path rather than the step count.
+        """
+        
+        steps = plan.steps
+        
+        # Dependencies name agents; resolve each to that agent's latest earlier step
+        latest_step_by_agent: Dict[str, int] = {}
+        step_dependencies: List[Set[int]] = []
+        
+        # Iterative plans repeat their agents in rounds, and a round may only
+        # start once the whole previous round has finished
+        iterative = plan.collaboration_type == CollaborationType.ITERATIVE
+        previous_round: Set[int] = set()
+        current_round: Dict[str, int] = {}
+        
+        for index, step in enumerate(steps):
+            dependencies = {
+                latest_step_by_agent[agent_id]
+                for agent_id in step.dependencies
+                if agent_id in latest_step_by_agent
+            }
+            if iterative:
+                if step.agent_id in current_round:
+                    previous_round = set(current_round.values())
+                    current_round = {}
+                dependencies |= previous_round
+                current_round[step.agent_id] = index
+            step_dependencies.append(dependencies)
+            latest_step_by_agent[step.agent_id] = index
+        
+        in_degree = [len(dependencies) for dependencies in step_dependencies]
+        dependents: List[List[int]] = [[] for _ in steps]
+        for index, dependencies in enumerate(step_dependencies):
+            for dependency in dependencies:
+                dependents[dependency].append(index)
+        
+        step_results: List[Optional[Dict[str, Any]]] = [None] * len(steps)
+        step_outputs: Dict[str, str] = {}
+        include_history = plan.collaboration_type in (CollaborationType.REVIEW, CollaborationType.ITERATIVE)
+        
+        async def run_step(index: int) -> int:
+            step = steps[index]
+            previous_outputs = {
+                steps[dependency].agent_id: step_results[dependency].get("output", "")
+                for dependency in step_dependencies[index]
+            }
             
-            # Execute parallel steps
-            if parallel_steps:
-                parallel_results = await asyncio.gather(*[
-                    self._execute_single_step(step, step_outputs, db)
-                    for step in parallel_steps
-                ])
-                
-                for i, step in enumerate(parallel_steps):
-                    results[step.agent_id] = parallel_results[i]
-                    step_outputs[step.agent_id] = parallel_results[i].get("output", "")
+            # Provide context from previous steps for feedback loops
+            context = ""
+            if include_history:
+                context = await asyncio.to_thread(self._build_step_context, step, dict(step_outputs))
             
-            # Execute dependent steps
-            for step in dependent_steps:
-                result = await self._execute_single_step(step, step_outputs, db)
-                results[step.agent_id] = result
-                step_outputs[step.agent_id] = result.get("output", "")
-                
-        elif plan.collaboration_type in [CollaborationType.REVIEW, CollaborationType.ITERATIVE]:
-            # Execute steps with feedback loops
-            for step in plan.steps:
-                # Provide context from previous steps
-                context = self._build_step_context(step, step_outputs)
-                result = await self._execute_single_step(step, step_outputs, db, context)
+            result = await self._execute_single_step(plan.id, index, step, previous_outputs, db, context)
+            step_results[index] = result
+            step_outputs[step.agent_id] = result.get("output", "")
+            return index
+        
+        pending = {
+            asyncio.create_task(run_step(index))
+            for index, degree in enumerate(in_degree) if degree == 0
+        }
+        
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    index = finished.result()
+                    for dependent in dependents[index]:
+                        in_degree[dependent] -= 1
+                        if in_degree[dependent] == 0:
+                            pending.add(asyncio.create_task(run_step(dependent)))
+        except BaseException:
+            for task in pending:
+                task.cancel()
+            raise
+        
+        # Key results by agent in plan order so an agent's last step wins
+        results = {}
+        for step, result in zip(steps, step_results):
+            if result is not None:
                 results[step.agent_id] = result
-                step_outputs[step.agent_id] = result.get("output", "")
         
         return results
     
     async def _execute_single_step(self,
+                                 collaboration_id: str,
+                                 step_order: int,
                                  step: CollaborationStep,
                                  previous_outputs: Dict[str, str],
                                  db: Session,
                                  additional_context: str = "") -> Dict[str, Any]:
         """Execute a single collaboration step"""
         
-        step.started_at = datetime.utcnow()
-        step.status = "in_progress"
+        # An agent can appear in several plans (and several times in one), so
+        # the step row is addressed by its collaboration and position.
+        step_record = db.query(CollaborationStepRecord).filter(
+            CollaborationStepRecord.collaboration_id == collaboration_id,
+            CollaborationStepRecord.step_order == step_order
+        )
         
-        # Update database
-        db.query(CollaborationStep).filter(
-            CollaborationStep.agent_id == step.agent_id
-        ).update({
-            "status": "in_progress",
-            "started_at": step.started_at
-        })
-        db.commit()
+        # The "in_progress" transition is kept in memory only; the row is
+        # written once when the step terminates so each step costs one commit.
+        step.started_at_ns = time.time_ns()
+        step.status = "in_progress"
         
         try:
             # Get agent
@@ -730,38 +940,44 @@ class CollaborationManager:
                 raise ValueError(f"Agent {step.agent_id} not found")
             
             # Build context from previous outputs
-            context = self._build_collaboration_context(step, previous_outputs, additional_context)
+            context = await asyncio.to_thread(
+                self._build_collaboration_context, step, previous_outputs, additional_context
+            )
             
             # Execute step
             logger.info(f"Executing step: {step.agent_name} - {step.task_description}")
             
-            # Create a mock task object for agent processing
-            mock_task = type('Task', (), {
-                'title': f"Collaboration Step: {step.task_description}",
-                'description': step.task_description + "\n\n" + context,
-                'priority': 'medium'
-            })()
+            # Wrap the step as a task object for agent processing
+            step_task = StepTask(
+                title=f"Collaboration Step: {step.task_description}",
+                description=step.task_description + "\n\n" + context
+            )
             
-            output = await agent.process_task(mock_task)
+            output = await agent.process_task(step_task)
             
             # Update step completion
-            step.completed_at = datetime.utcnow()
+            step.completed_at_ns = time.time_ns()
             step.status = "completed"
             step.output = output
             
             # Calculate quality score (simplified)
-            quality_score = self._assess_step_quality(output, step.outputs)
+            quality_score = await asyncio.to_thread(self._assess_step_quality, output, step.outputs)
             step.quality_score = quality_score
             
             # Update database
-            db.query(CollaborationStep).filter(
-                CollaborationStep.agent_id == step.agent_id
-            ).update({
+            step_record.update({
                 "status": "completed",
-                "completed_at": step.completed_at,
+                "started_at_ns": step.started_at_ns,
+                "completed_at_ns": step.completed_at_ns,
                 "output": output,
                 "quality_score": quality_score
             })
+            # Keep the progress counter current so status polls need not count steps
+            db.query(TaskCollaboration).filter(
+                TaskCollaboration.id == collaboration_id
+            ).update({
+                "completed_steps": TaskCollaboration.completed_steps + 1
+            }, synchronize_session=False)
             db.commit()
             
             logger.info(f"Step completed: {step.agent_name} (Quality: {quality_score:.2f})")
@@ -771,17 +987,16 @@ class CollaborationManager:
                 "agent_name": step.agent_name,
                 "output": output,
                 "quality_score": quality_score,
-                "duration": (step.completed_at - step.started_at).total_seconds() / 3600
+                "duration": (step.completed_at_ns - step.started_at_ns) / NS_PER_HOUR
             }
             
         except Exception as e:
             step.status = "failed"
             step.feedback = str(e)
             
-            db.query(CollaborationStep).filter(
-                CollaborationStep.agent_id == step.agent_id
-            ).update({
+            step_record.update({
                 "status": "failed",
+                "started_at_ns": step.started_at_ns,
                 "feedback": str(e)
             })
             db.commit()
@@ -795,40 +1010,40 @@ class CollaborationManager:
                                    additional_context: str = "") -> str:
         """Build context for the current collaboration step"""
         
-        context_parts = []
+        buf = io.StringIO()
+        w = buf.write
         
         # Add collaboration context
-        context_parts.append("=== COLLABORATION CONTEXT ===")
-        context_parts.append(f"You are working on a collaborative task with other AI agents.")
-        context_parts.append(f"Your role: {current_step.agent_name}")
-        context_parts.append(f"Task: {current_step.task_description}")
+        w(_CONTEXT_HEADER)
+        w(f"Your role: {current_step.agent_name}\n")
+        w(f"Task: {current_step.task_description}\n")
         
         # Add previous outputs if available
         if previous_outputs:
-            context_parts.append("\n=== PREVIOUS WORK ===")
-            for agent_id, output in previous_outputs.items():
-                if agent_id in current_step.dependencies:
-                    context_parts.append(f"Input from previous step ({agent_id}):")
-                    context_parts.append(output[:1000] + "..." if len(output) > 1000 else output)
-                    context_parts.append("")
+            w("\n=== PREVIOUS WORK ===\n")
+            dependencies = set(current_step.dependencies)
+            if dependencies:
+                for agent_id, output in previous_outputs.items():
+                    if agent_id in dependencies:
+                        w(f"Input from previous step ({agent_id}):\n")
+                        w(_truncate(output, 1000))
+                        w("\n\n")
         
         # Add expected outputs
         if current_step.outputs:
-            context_parts.append("=== EXPECTED OUTPUTS ===")
-            context_parts.append("Please provide:")
+            w(_EXPECTED_OUTPUTS_HEADER)
             for output_type in current_step.outputs:
-                context_parts.append(f"- {output_type.replace('_', ' ').title()}")
+                w(f"- {output_type.replace('_', ' ').title()}\n")
         
         # Add additional context
         if additional_context:
-            context_parts.append("\n=== ADDITIONAL CONTEXT ===")
-            context_parts.append(additional_context)
+            w("\n=== ADDITIONAL CONTEXT ===\n")
+            w(additional_context)
+            w("\n")
         
-        context_parts.append("\n=== INSTRUCTIONS ===")
-        context_parts.append("Build upon the previous work and coordinate with the overall goal.")
-        context_parts.append("Provide detailed, high-quality output that the next agent can use.")
+        w(_CONTEXT_FOOTER)
         
-        return "\n".join(context_parts)
+        return buf.getvalue()
     
     def _build_step_context(self, step: CollaborationStep, step_outputs: Dict[str, str]) -> str:
         """Build context for review/iterative collaboration"""
@@ -836,15 +1051,17 @@ class CollaborationManager:
         if not step_outputs:
             return ""
         
-        context_parts = ["=== COLLABORATION HISTORY ==="]
+        buf = io.StringIO()
+        w = buf.write
+        w(_HISTORY_HEADER)
         
         for agent_id, output in step_outputs.items():
             if agent_id != step.agent_id:  # Don't include own previous output
-                context_parts.append(f"Previous contribution:")
-                context_parts.append(output[:500] + "..." if len(output) > 500 else output)
-                context_parts.append("")
+                w("\nPrevious contribution:\n")
+                w(_truncate(output, 500))
+                w("\n")
         
-        return "\n".join(context_parts)
+        return buf.getvalue()
     
     def _assess_step_quality(self, output: str, expected_outputs: List[str]) -> float:
         """Assess the quality of a collaboration step output"""
@@ -864,11 +1081,8 @@ class CollaborationManager:
         
         # Content completeness based on expected outputs
         if expected_outputs:
-            matched_outputs = 0
-            for expected in expected_outputs:
-                expected_keywords = expected.replace('_', ' ').split()
-                if any(keyword.lower() in output.lower() for keyword in expected_keywords):
-                    matched_outputs += 1
+            match = _expected_output_matcher(tuple(expected_outputs))
+            matched_outputs = bin(match(output.lower())).count("1")
             
             completeness_score = matched_outputs / len(expected_outputs)
             quality_score += completeness_score * 0.5
@@ -880,78 +1094,88 @@ class CollaborationManager:
     async def _compile_collaboration_output(self, plan: CollaborationPlan, results: Dict[str, Any]) -> str:
         """Compile final output from all collaboration steps"""
         
-        output_parts = []
+        buf = io.StringIO()
+        w = buf.write
         
         # Header
-        output_parts.append(f"# Collaborative Task Result")
-        output_parts.append(f"**Collaboration Type:** {plan.collaboration_type.value.title()}")
-        output_parts.append(f"**Agents Involved:** {len(plan.agents_involved)}")
-        output_parts.append(f"**Completed Steps:** {len(plan.steps)}")
-        output_parts.append("")
+        w("# Collaborative Task Result\n**Collaboration Type:** ")
+        w(plan.collaboration_type.value.title())
+        w("\n**Agents Involved:** ")
+        w(str(len(plan.agents_involved)))
+        w("\n**Completed Steps:** ")
+        w(str(len(plan.steps)))
+        w("\n\n")
         
         # Summary
-        output_parts.append("## Executive Summary")
+        w("## Executive Summary\n")
         
         # Determine primary output based on collaboration type
-        if plan.collaboration_type == CollaborationType.SEQUENTIAL:
-            # Use output from last step
-            last_step = plan.steps[-1]
-            if last_step.agent_id in results:
-                primary_result = results[last_step.agent_id]
-                output_parts.append(f"Final deliverable completed by {last_step.agent_name}:")
-                output_parts.append("")
-                output_parts.append(primary_result.get("output", ""))
-        
-        elif plan.collaboration_type == CollaborationType.PARALLEL:
-            output_parts.append("Parallel development completed with coordinated outputs:")
-            output_parts.append("")
-            
-            for step in plan.steps:
-                if step.agent_id in results:
-                    result = results[step.agent_id]
-                    output_parts.append(f"### {step.agent_name} Contribution")
-                    output_parts.append(result.get("output", ""))
-                    output_parts.append("")
-        
-        elif plan.collaboration_type == CollaborationType.REVIEW:
-            # Use final revised output
-            review_steps = [s for s in plan.steps if "review" not in s.task_description.lower()]
-            if review_steps and review_steps[-1].agent_id in results:
-                final_result = results[review_steps[-1].agent_id]
-                output_parts.append("Final reviewed and refined deliverable:")
-                output_parts.append("")
-                output_parts.append(final_result.get("output", ""))
-        
-        elif plan.collaboration_type == CollaborationType.ITERATIVE:
-            # Use output from final iteration
-            final_step = plan.steps[-1]
-            if final_step.agent_id in results:
-                final_result = results[final_step.agent_id]
-                output_parts.append("Final iteratively refined deliverable:")
-                output_parts.append("")
-                output_parts.append(final_result.get("output", ""))
+        compile_summary = self._summary_compilers.get(plan.collaboration_type)
+        if compile_summary:
+            compile_summary(plan, results, w)
         
         # Add collaboration metadata
-        output_parts.append("\n---\n")
-        output_parts.append("## Collaboration Details")
+        w("\n---\n\n## Collaboration Details\n")
         
         total_duration = sum(r.get("duration", 0) for r in results.values())
         avg_quality = sum(r.get("quality_score", 0) for r in results.values()) / len(results) if results else 0
         
-        output_parts.append(f"- **Total Duration:** {total_duration:.1f} hours")
-        output_parts.append(f"- **Average Quality Score:** {avg_quality:.2f}/1.0")
-        output_parts.append(f"- **Collaboration Efficiency:** {self._calculate_collaboration_efficiency(plan, total_duration):.1f}%")
+        w(f"- **Total Duration:** {total_duration:.1f} hours\n")
+        w(f"- **Average Quality Score:** {avg_quality:.2f}/1.0\n")
+        w(f"- **Collaboration Efficiency:** {self._calculate_collaboration_efficiency(plan, total_duration):.1f}%\n")
         
         # Individual contributions summary
-        output_parts.append("\n### Individual Contributions")
+        w("\n### Individual Contributions")
         for step in plan.steps:
             if step.agent_id in results:
                 result = results[step.agent_id]
-                output_parts.append(f"- **{step.agent_name}:** {step.task_description}")
-                output_parts.append(f"  - Duration: {result.get('duration', 0):.1f}h")
-                output_parts.append(f"  - Quality: {result.get('quality_score', 0):.2f}/1.0")
+                w(f"\n- **{step.agent_name}:** {step.task_description}")
+                w(f"\n  - Duration: {result.get('duration', 0):.1f}h")
+                w(f"\n  - Quality: {result.get('quality_score', 0):.2f}/1.0")
         
-        return "\n".join(output_parts)
+        return buf.getvalue()
+    
+    def _compile_sequential_summary(self, plan: CollaborationPlan, results: Dict[str, Any],
+                                    w: Callable[[str], int]):
+        """Use output from last step"""
+        last_step = plan.steps[-1]
+        if last_step.agent_id in results:
+            primary_result = results[last_step.agent_id]
+            w(f"Final deliverable completed by {last_step.agent_name}:\n\n")
+            w(primary_result.get("output", ""))
+            w("\n")
+    
+    def _compile_parallel_summary(self, plan: CollaborationPlan, results: Dict[str, Any],
+                                  w: Callable[[str], int]):
+        """Include every agent's contribution"""
+        w("Parallel development completed with coordinated outputs:\n\n")
+        
+        for step in plan.steps:
+            if step.agent_id in results:
+                result = results[step.agent_id]
+                w(f"### {step.agent_name} Contribution\n")
+                w(result.get("output", ""))
+                w("\n\n")
+    
+    def _compile_review_summary(self, plan: CollaborationPlan, results: Dict[str, Any],
+                                w: Callable[[str], int]):
+        """Use final revised output"""
+        review_steps = [s for s in plan.steps if "review" not in s.task_description.lower()]
+        if review_steps and review_steps[-1].agent_id in results:
+            final_result = results[review_steps[-1].agent_id]
+            w("Final reviewed and refined deliverable:\n\n")
+            w(final_result.get("output", ""))
+            w("\n")
+    
+    def _compile_iterative_summary(self, plan: CollaborationPlan, results: Dict[str, Any],
+                                   w: Callable[[str], int]):
+        """Use output from final iteration"""
+        final_step = plan.steps[-1]
+        if final_step.agent_id in results:
+            final_result = results[final_step.agent_id]
+            w("Final iteratively refined deliverable:\n\n")
+            w(final_result.get("output", ""))
+            w("\n")
     
     def _calculate_collaboration_efficiency(self, plan: CollaborationPlan, actual_duration: float) -> float:
         """Calculate collaboration efficiency percentage"""
@@ -1019,17 +1243,31 @@ class CollaborationManager:
     async def get_collaboration_status(self, collaboration_id: str, db: Session) -> Dict[str, Any]:
         """Get current status of a collaboration"""
         
-        collaboration = db.query(TaskCollaboration).filter(
+        # Fetch the collaboration and the step columns we report in one round-trip
+        rows = db.query(
+            TaskCollaboration,
+            CollaborationStepRecord.step_order,
+            CollaborationStepRecord.agent_name,
+            CollaborationStepRecord.task_description,
+            CollaborationStepRecord.status,
+            CollaborationStepRecord.estimated_duration,
+            CollaborationStepRecord.started_at,
+            CollaborationStepRecord.completed_at,
+            CollaborationStepRecord.started_at_ns,
+            CollaborationStepRecord.completed_at_ns,
+            CollaborationStepRecord.quality_score
+        ).outerjoin(
+            CollaborationStepRecord, CollaborationStepRecord.collaboration_id == TaskCollaboration.id
+        ).filter(
             TaskCollaboration.id == collaboration_id
-        ).first()
+        ).order_by(CollaborationStepRecord.step_order).all()
         
-        if not collaboration:
+        if not rows:
             raise ValueError(f"Collaboration {collaboration_id} not found")
         
-        # Get step details
-        steps = db.query(CollaborationStep).filter(
-            CollaborationStep.collaboration_id == collaboration_id
-        ).order_by(CollaborationStep.step_order).all()
+        collaboration = rows[0][0]
+        # A collaboration without steps comes back as a single row of NULL step columns
+        steps = [row for row in rows if row.step_order is not None]
         
         step_status = []
         for step in steps:
@@ -1038,15 +1276,16 @@ class CollaborationManager:
                 "task_description": step.task_description,
                 "status": step.status,
                 "estimated_duration": step.estimated_duration,
-                "started_at": step.started_at.isoformat() if step.started_at else None,
-                "completed_at": step.completed_at.isoformat() if step.completed_at else None,
+                "started_at": _timestamp_isoformat(step.started_at_ns, step.started_at),
+                "completed_at": _timestamp_isoformat(step.completed_at_ns, step.completed_at),
                 "quality_score": step.quality_score
             }
             step_status.append(step_info)
         
-        # Calculate progress
-        completed_steps = len([s for s in steps if s.status == "completed"])
-        progress_percentage = (completed_steps / len(steps)) * 100 if steps else 0
+        # Calculate progress from the counters maintained as steps complete
+        completed_steps = collaboration.completed_steps or 0
+        total_steps = collaboration.total_steps or len(steps)
+        progress_percentage = (completed_steps / total_steps) * 100 if total_steps else 0
         
         return {
             "collaboration_id": collaboration_id,
@@ -1054,12 +1293,12 @@ class CollaborationManager:
             "collaboration_type": collaboration.collaboration_type,
             "progress_percentage": progress_percentage,
             "completed_steps": completed_steps,
-            "total_steps": len(steps),
+            "total_steps": total_steps,
             "estimated_duration": collaboration.estimated_duration,
             "created_at": collaboration.created_at.isoformat(),
             "started_at": collaboration.started_at.isoformat() if collaboration.started_at else None,
             "completed_at": collaboration.completed_at.isoformat() if collaboration.completed_at else None,
-            "agents_involved": json.loads(collaboration.agents_involved) if collaboration.agents_involved else [],
+            "agents_involved": collaboration.agents_involved or [],
             "steps": step_status,
             "final_output": collaboration.final_output
         }
@@ -1081,14 +1320,15 @@ class CollaborationManager:
         collaboration.status = "cancelled"
         collaboration.feedback = f"Cancelled: {reason}"
         
-        # Cancel any pending steps
-        db.query(CollaborationStep).filter(
-            CollaborationStep.collaboration_id == collaboration_id,
-            CollaborationStep.status.in_(["pending", "in_progress"])
+        # Cancel any pending steps in one UPDATE; step rows are never loaded into
+        # this session here, so skip synchronizing it with the matched rows
+        db.query(CollaborationStepRecord).filter(
+            CollaborationStepRecord.collaboration_id == collaboration_id,
+            CollaborationStepRecord.status.in_(["pending", "in_progress"])
         ).update({
             "status": "cancelled",
             "feedback": f"Cancelled due to collaboration cancellation: {reason}"
-        })
+        }, synchronize_session=False)
         
         db.commit()
         
@@ -1103,12 +1343,15 @@ class CollaborationManager:
         
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         
-        # Get collaborations from the specified period
-        collaborations = db.query(TaskCollaboration).filter(
-            TaskCollaboration.created_at >= cutoff_date
-        ).all()
+        # Aggregate status and type counts in the database
+        status_counts = dict(
+            db.query(TaskCollaboration.status, func.count(TaskCollaboration.id)).filter(
+                TaskCollaboration.created_at >= cutoff_date
+            ).group_by(TaskCollaboration.status).all()
+        )
         
-        if not collaborations:
+        total_collaborations = sum(status_counts.values())
+        if not total_collaborations:
             return {
                 "total_collaborations": 0,
                 "success_rate": 0,
@@ -1118,31 +1361,31 @@ class CollaborationManager:
             }
         
         # Calculate metrics
-        total_collaborations = len(collaborations)
-        successful_collaborations = len([c for c in collaborations if c.status == "completed"])
+        successful_collaborations = status_counts.get("completed", 0)
         success_rate = (successful_collaborations / total_collaborations) * 100
         
         # Duration metrics
-        completed_collaborations = [c for c in collaborations if c.completed_at and c.started_at]
-        if completed_collaborations:
-            durations = [(c.completed_at - c.started_at).total_seconds() / 3600 for c in completed_collaborations]
-            avg_duration = sum(durations) / len(durations)
-        else:
-            avg_duration = 0
+        avg_duration_seconds = db.query(
+            func.avg(
+                func.extract('epoch', TaskCollaboration.completed_at) -
+                func.extract('epoch', TaskCollaboration.started_at)
+            )
+        ).filter(
+            TaskCollaboration.created_at >= cutoff_date,
+            TaskCollaboration.started_at.isnot(None),
+            TaskCollaboration.completed_at.isnot(None)
+        ).scalar()
+        avg_duration = float(avg_duration_seconds) / 3600 if avg_duration_seconds is not None else 0
         
         # Collaboration type distribution
-        type_distribution = {}
-        for collab in collaborations:
-            collab_type = collab.collaboration_type
-            type_distribution[collab_type] = type_distribution.get(collab_type, 0) + 1
+        type_distribution = dict(
+            db.query(TaskCollaboration.collaboration_type, func.count(TaskCollaboration.id)).filter(
+                TaskCollaboration.created_at >= cutoff_date
+            ).group_by(TaskCollaboration.collaboration_type).all()
+        )
         
         # Agent participation
-        agent_participation = {}
-        for collab in collaborations:
-            if collab.agents_involved:
-                agents = json.loads(collab.agents_involved)
-                for agent_id in agents:
-                    agent_participation[agent_id] = agent_participation.get(agent_id, 0) + 1
+        agent_participation = self._get_agent_participation(db, cutoff_date)
         
         return {
             "period_days": days,
@@ -1152,38 +1395,69 @@ class CollaborationManager:
             "avg_duration_hours": avg_duration,
             "collaboration_types": type_distribution,
             "agent_participation": agent_participation,
-            "efficiency_trends": self._calculate_efficiency_trends(collaborations)
+            "efficiency_trends": self._calculate_efficiency_trends(db, cutoff_date)
         }
     
-    def _calculate_efficiency_trends(self, collaborations: List[TaskCollaboration]) -> Dict[str, float]:
-        """Calculate efficiency trends over time"""
+    def _get_agent_participation(self, db: Session, cutoff_date: datetime) -> Dict[str, int]:
+        """Count collaborations per agent by expanding agents_involved in the database"""
         
-        completed_collaborations = [c for c in collaborations if c.status == "completed" and c.estimated_duration]
+        if db.get_bind().dialect.name == "postgresql":
+            agents = func.json_array_elements_text(
+                TaskCollaboration.agents_involved
+            ).table_valued("value").render_derived()
+        else:
+            agents = func.json_each(TaskCollaboration.agents_involved).table_valued("value")
         
-        if not completed_collaborations:
-            return {"avg_efficiency": 0, "efficiency_trend": 0}
+        rows = db.query(agents.c.value, func.count()).select_from(TaskCollaboration).join(
+            agents, true()
+        ).filter(
+            TaskCollaboration.created_at >= cutoff_date
+        ).group_by(agents.c.value).all()
         
-        efficiencies = []
-        for collab in completed_collaborations:
-            if collab.actual_duration and collab.estimated_duration:
-                efficiency = (collab.estimated_duration / collab.actual_duration) * 100
-                efficiencies.append(min(efficiency, 200))  # Cap at 200%
+        return dict(rows)
+    
+    def _record_collaboration_efficiency(self, efficiency: float, db: Session):
+        """Add a completed collaboration's efficiency to today's totals"""
+        
+        # A single upsert, so concurrent completions add to the same row safely
+        insert = _UPSERT_INSERTS[db.get_bind().dialect.name]
+        statement = insert(CollaborationEfficiency).values(
+            day=datetime.utcnow().date(),
+            efficiency_sum=efficiency,
+            sample_count=1
+        )
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[CollaborationEfficiency.day],
+            set_={
+                "efficiency_sum": CollaborationEfficiency.efficiency_sum + statement.excluded.efficiency_sum,
+                "sample_count": CollaborationEfficiency.sample_count + statement.excluded.sample_count
+            }
+        ))
+    
+    def _calculate_efficiency_trends(self, db: Session, cutoff_date: datetime) -> Dict[str, float]:
+        """Calculate efficiency trends over time
+        
+        Reads the per-day totals kept as collaborations complete, from
+        cutoff_date's day onwards.
+        """
         
-        avg_efficiency = sum(efficiencies) / len(efficiencies) if efficiencies else 0
+        days = db.query(CollaborationEfficiency.efficiency_sum, CollaborationEfficiency.sample_count).filter(
+            CollaborationEfficiency.day >= cutoff_date.date()
+        ).order_by(CollaborationEfficiency.day).all()
+        
+        if not days:
+            return {"avg_efficiency": 0, "efficiency_trend": 0}
+        
+        def average(rows) -> float:
+            return sum(row.efficiency_sum for row in rows) / sum(row.sample_count for row in rows)
         
         # Simple trend calculation (positive means improving efficiency)
-        if len(efficiencies) >= 2:
-            first_half = efficiencies[:len(efficiencies)//2]
-            second_half = efficiencies[len(efficiencies)//2:]
-            
-            first_avg = sum(first_half) / len(first_half)
-            second_avg = sum(second_half) / len(second_half)
-            
-            efficiency_trend = second_avg - first_avg
+        if len(days) >= 2:
+            efficiency_trend = average(days[len(days)//2:]) - average(days[:len(days)//2])
         else:
             efficiency_trend = 0
         
         return {
-            "avg_efficiency": avg_efficiency,
+            "avg_efficiency": average(days),
             "efficiency_trend": efficiency_trend
         }
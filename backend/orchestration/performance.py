@@ -1,21 +1,60 @@
 # VirtuAI Office - Performance Analytics & Optimization System
 import asyncio
+import math
+import os
+import sys
+import threading
 import time
 import psutil
-import statistics
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
-from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Any, Tuple
+from dataclasses import dataclass
 from enum import Enum
 import json
 import logging
-from collections import defaultdict, deque
+
+import numpy as np
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, case
 
 logger = logging.getLogger('virtuai.performance')
 
+# slots=True is only accepted by dataclass on Python 3.10 and later
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# /proc files read directly by the Linux metrics fast path
+PROC_COUNTER_FILES = ("stat", "meminfo", "loadavg", "diskstats", "net/dev")
+DISK_SECTOR_SIZE = 512  # /proc/diskstats always counts 512-byte sectors
+
+METRICS_BUFFER_SIZE = 1024  # Metrics retained by the collector ring buffer (power of two)
+BENCHMARK_BUFFER_SIZE = 500  # Agent benchmarks retained by the analyzer
+NS_PER_MINUTE = 60_000_000_000
+NS_PER_HOUR = 60 * NS_PER_MINUTE
+
+PSUTIL_CACHE_TTL_NS = 200_000_000  # Reuse system readings taken within 200 ms
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _ns_to_datetime(value: int) -> datetime:
+    """Integer epoch nanoseconds to naive UTC datetime"""
+    return _EPOCH + timedelta(microseconds=value // 1000)
+
+
+_psutil_cache: Dict[str, Tuple[int, Any]] = {}
+
+
+def _cached_psutil(name: str, reader: Callable[[], Any]) -> Any:
+    """Return a reading taken within the TTL, calling `reader` only when stale"""
+    now = time.monotonic_ns()
+    hit = _psutil_cache.get(name)
+    if hit is not None and now - hit[0] < PSUTIL_CACHE_TTL_NS:
+        return hit[1]
+    value = reader()
+    _psutil_cache[name] = (now, value)
+    return value
+
 
 class PerformanceMetricType(str, Enum):
     CPU_USAGE = "cpu_usage"
@@ -30,6 +69,22 @@ class PerformanceMetricType(str, Enum):
     THERMAL_STATE = "thermal_state"
 
 
+# (name, unit) of the metrics sampled on every collection tick
+SYSTEM_METRICS = (
+    (PerformanceMetricType.CPU_USAGE, "percent"),
+    (PerformanceMetricType.MEMORY_USAGE, "percent"),
+    ("system_load", "load"),
+    ("disk_read_rate", "bytes/sec"),
+    ("disk_write_rate", "bytes/sec"),
+    ("network_sent", "bytes/sec"),
+    ("network_received", "bytes/sec"),
+)
+
+# Cumulative I/O counters reported as per-second rates, in _sample_system order
+IO_RATE_METRICS = ("disk_read_rate", "disk_write_rate", "network_sent", "network_received")
+IO_RATE_MIN = 1.0  # bytes/sec; slower rates are not recorded
+
+
 class PerformanceLevel(str, Enum):
     EXCELLENT = "excellent"  # 90-100%
     GOOD = "good"           # 70-89%
@@ -37,17 +92,24 @@ class PerformanceLevel(str, Enum):
     POOR = "poor"           # 0-49%
 
 
-@dataclass
+# Metric score and level by number of thresholds met (0-3); index -1 is the
+# default for metrics without thresholds
+THRESHOLD_SCORES = np.array([25.0, 50.0, 75.0, 100.0, 75.0])
+THRESHOLD_LEVELS = (PerformanceLevel.POOR, PerformanceLevel.FAIR, PerformanceLevel.GOOD,
+                    PerformanceLevel.EXCELLENT, PerformanceLevel.GOOD)
+
+
+@dataclass(**_DATACLASS_SLOTS)
 class PerformanceMetric:
     name: str
     value: float
     unit: str
-    timestamp: datetime
+    timestamp: int  # time.time_ns() epoch nanoseconds
     component: str
-    metadata: Dict[str, Any] = field(default_factory=dict)
+    metadata: Optional[Dict[str, Any]] = None
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class PerformanceBenchmark:
     agent_id: str
     task_complexity: str
@@ -57,7 +119,7 @@ class PerformanceBenchmark:
     memory_usage: float     # MB
     cpu_usage: float        # percentage
     quality_score: float    # 0-1
-    timestamp: datetime
+    timestamp: int          # time.time_ns() epoch nanoseconds
 
 
 @dataclass
@@ -78,15 +140,66 @@ class PerformanceCollector:
     
     def __init__(self, collection_interval: int = 30):
         self.collection_interval = collection_interval
-        self.metrics_buffer = deque(maxlen=1000)  # Store last 1000 metrics
         self.is_collecting = False
         self.collection_task = None
         
+        # Metrics ring buffer stored as parallel columns (structure of arrays)
+        self._capacity = METRICS_BUFFER_SIZE
+        self._index_mask = self._capacity - 1  # Capacity is a power of two
+        self._ts = np.zeros(self._capacity, dtype=np.int64)  # epoch nanoseconds
+        self._val = np.zeros(self._capacity, dtype=np.float64)
+        self._name_id = np.zeros(self._capacity, dtype=np.int16)
+        self._component_id = np.zeros(self._capacity, dtype=np.int16)
+        self._unit_id = np.zeros(self._capacity, dtype=np.int16)
+        self._metadata = np.empty(self._capacity, dtype=object)
+        # Total metrics ever written. The single writer bumps it after filling a
+        # slot; readers snapshot it once and derive head/count without a lock
+        self._written = 0
+        
+        # Metric names, components and units interned to small integer ids
+        self._name_table: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._component_table: Dict[str, int] = {}
+        self._components: List[str] = []
+        self._unit_table: Dict[str, int] = {}
+        self._units: List[str] = []
+        
+        # Previous I/O counters and their sample time, for per-second rates
+        self._prev_io: Optional[Tuple[int, Tuple[Optional[int], ...]]] = None
+        
+        # Pre-interned (name_id, unit_id) pairs for the sampled system metrics
+        self._system_component_id = self._intern(self._component_table, self._components, "system")
+        self._system_metric_ids = {
+            name: (self._intern(self._name_table, self._names, name),
+                   self._intern(self._unit_table, self._units, unit))
+            for name, unit in SYSTEM_METRICS
+        }
+        
+        # On Linux, counters are read straight from pre-opened /proc files. The
+        # descriptors are shared by every sampling thread, so each seek+read
+        # pass (and closing them) happens under the lock
+        self._proc_lock = threading.Lock()
+        self._proc_fds = self._open_proc_fds()
+        self._storage_devices = self._list_storage_devices() if self._proc_fds else set()
+        self._prev_cpu_times: Optional[Tuple[int, int]] = None
+        
+        # Prime the CPU counter so later non-blocking reads return a delta
+        if self._proc_fds:
+            self._read_proc_cpu_percent(self._read_proc("stat"))
+        else:
+            psutil.cpu_percent(interval=None)
+        
     async def start_collection(self):
         """Start continuous metrics collection"""
         if self.is_collecting:
             return
         
+        with self._proc_lock:
+            if self._proc_fds is None:
+                # Reopen the /proc files released by a previous stop
+                self._proc_fds = self._open_proc_fds()
+                self._storage_devices = self._list_storage_devices() if self._proc_fds else set()
+        
         self.is_collecting = True
         self.collection_task = asyncio.create_task(self._collection_loop())
         logger.info("Performance metrics collection started")
@@ -100,126 +213,333 @@ class PerformanceCollector:
                 await self.collection_task
             except asyncio.CancelledError:
                 pass
+        self.close()
         logger.info("Performance metrics collection stopped")
     
+    def close(self):
+        """Release the pre-opened /proc files; later samples fall back to psutil"""
+        with self._proc_lock:
+            self._close_proc_fds()
+    
+    def _close_proc_fds(self):
+        """Close the /proc descriptors; the caller holds _proc_lock"""
+        if self._proc_fds:
+            for fd in self._proc_fds.values():
+                os.close(fd)
+        self._proc_fds = None
+    
     async def _collection_loop(self):
         """Main collection loop"""
+        # Sample on fixed deadlines so collection cost does not stretch the period
+        deadline = time.monotonic()
         while self.is_collecting:
             try:
-                metrics = await self.collect_system_metrics()
-                for metric in metrics:
-                    self.metrics_buffer.append(metric)
-                
-                await asyncio.sleep(self.collection_interval)
-                
+                await self.collect_system_metrics()
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"Error in performance collection: {e}")
-                await asyncio.sleep(self.collection_interval)
+            
+            deadline += self.collection_interval
+            now = time.monotonic()
+            if deadline < now - self.collection_interval:
+                # Stalled for more than a period: resume cadence instead of catching up
+                deadline = now + self.collection_interval
+            
+            try:
+                await asyncio.sleep(max(0.0, deadline - now))
+            except asyncio.CancelledError:
+                break
+    
+    @staticmethod
+    def _open_proc_fds() -> Optional[Dict[str, int]]:
+        """Open the /proc counter files once; None when unavailable (non-Linux)"""
+        if not sys.platform.startswith("linux"):
+            return None
+        
+        fds: Dict[str, int] = {}
+        try:
+            for name in PROC_COUNTER_FILES:
+                fds[name] = os.open(f"/proc/{name}", os.O_RDONLY)
+        except OSError as e:
+            logger.debug(f"Falling back to psutil for system metrics: {e}")
+            for fd in fds.values():
+                os.close(fd)
+            return None
+        return fds
+    
+    @staticmethod
+    def _list_storage_devices() -> set:
+        """Whole-disk device names, matching psutil's partition filtering"""
+        try:
+            return set(os.listdir("/sys/block"))
+        except OSError:
+            return set()
+    
+    def _read_proc(self, name: str) -> bytes:
+        """Re-read a pre-opened /proc file from the start"""
+        fd = self._proc_fds[name]
+        os.lseek(fd, 0, os.SEEK_SET)
+        chunks = []
+        while True:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks)
+    
+    def _read_proc_cpu_percent(self, stat: bytes) -> float:
+        """CPU utilization since the previous read, computed like psutil.cpu_percent"""
+        # cpu user nice system idle iowait irq softirq steal guest guest_nice
+        fields = [int(v) for v in stat[:stat.index(b"\n")].split()[1:]]
+        # guest time is already accounted for in user/nice
+        total = sum(fields[:8])
+        busy = total - fields[3] - fields[4]
+        
+        previous = self._prev_cpu_times
+        self._prev_cpu_times = (total, busy)
+        if previous is None or total <= previous[0]:
+            return 0.0
+        busy_delta = max(busy - previous[1], 0)
+        return round(min(busy_delta / (total - previous[0]) * 100, 100.0), 1)
+    
+    def _sample_proc(self) -> Tuple[float, float, int, int, Optional[float],
+                                    Optional[int], Optional[int], Optional[int], Optional[int]]:
+        """Read all system counters in one pass over the pre-opened /proc files"""
+        cpu_percent = self._read_proc_cpu_percent(self._read_proc("stat"))
+        
+        meminfo = {}
+        for line in self._read_proc("meminfo").splitlines():
+            key, _, rest = line.partition(b":")
+            if key in (b"MemTotal", b"MemAvailable"):
+                meminfo[key] = int(rest.split()[0]) * 1024
+        memory_total = meminfo[b"MemTotal"]
+        memory_available = meminfo.get(b"MemAvailable", 0)
+        memory_percent = round((memory_total - memory_available) / memory_total * 100, 1)
+        
+        load_avg = float(self._read_proc("loadavg").split(None, 1)[0])
+        
+        disk_read = disk_write = 0
+        for line in self._read_proc("diskstats").splitlines():
+            fields = line.split()
+            if len(fields) >= 10 and fields[2].decode() in self._storage_devices:
+                disk_read += int(fields[5]) * DISK_SECTOR_SIZE
+                disk_write += int(fields[9]) * DISK_SECTOR_SIZE
+        
+        net_sent = net_recv = 0
+        for line in self._read_proc("net/dev").splitlines()[2:]:
+            _, _, counters = line.partition(b":")
+            fields = counters.split()
+            net_recv += int(fields[0])
+            net_sent += int(fields[8])
+        
+        return (cpu_percent, memory_percent, memory_available, memory_total, load_avg,
+                disk_read, disk_write, net_sent, net_recv)
     
-    async def collect_system_metrics(self) -> List[PerformanceMetric]:
-        """Collect current system metrics"""
-        timestamp = datetime.utcnow()
-        metrics = []
+    def sample_system(self) -> Tuple[float, float, int, int, Optional[float],
+                                     Optional[int], Optional[int], Optional[int], Optional[int]]:
+        """Raw system counters, reused across callers within PSUTIL_CACHE_TTL_NS
+        
+        Returns (cpu_percent, memory_percent, memory_available, memory_total,
+        load_avg, disk_read, disk_write, net_sent, net_recv). Blocking syscalls;
+        run it off the event loop. Safe to call from several threads at once.
+        """
+        return _cached_psutil("system", self._sample_system)
+    
+    def _sample_system(self) -> Tuple[float, float, int, int, Optional[float],
+                                      Optional[int], Optional[int], Optional[int], Optional[int]]:
+        """Read raw system counters from /proc when available, else psutil"""
+        with self._proc_lock:
+            if self._proc_fds:
+                try:
+                    return self._sample_proc()
+                except (OSError, ValueError, KeyError, IndexError) as e:
+                    logger.warning(f"Reading /proc counters failed, using psutil: {e}")
+                    self._close_proc_fds()
+        
+        # Non-blocking form: utilization since the previous call
+        cpu_percent = _cached_psutil("cpu_percent", psutil.cpu_percent)
+        memory = _cached_psutil("virtual_memory", psutil.virtual_memory)
+        # 1-minute load average
+        load_avg = _cached_psutil("getloadavg", psutil.getloadavg)[0] if hasattr(psutil, 'getloadavg') else None
+        
+        disk_io = psutil.disk_io_counters()
+        disk_read, disk_write = (disk_io.read_bytes, disk_io.write_bytes) if disk_io else (None, None)
+        
+        network_io = psutil.net_io_counters()
+        net_sent, net_recv = (network_io.bytes_sent, network_io.bytes_recv) if network_io else (None, None)
+        
+        return (cpu_percent, memory.percent, memory.available, memory.total, load_avg,
+                disk_read, disk_write, net_sent, net_recv)
+    
+    async def collect_system_metrics(self) -> int:
+        """Sample system metrics straight into the ring buffer; returns how many were written"""
+        timestamp = time.time_ns()
+        written = self._written
+        ids = self._system_metric_ids
+        system = self._system_component_id
         
         try:
+            (cpu_percent, memory_percent, memory_available, memory_total, load_avg,
+             disk_read, disk_write, net_sent, net_recv) = await asyncio.to_thread(self.sample_system)
+            
             # CPU metrics
-            cpu_percent = psutil.cpu_percent(interval=1)
-            metrics.append(PerformanceMetric(
-                name=PerformanceMetricType.CPU_USAGE,
-                value=cpu_percent,
-                unit="percent",
-                timestamp=timestamp,
-                component="system"
-            ))
+            self._emit(*ids[PerformanceMetricType.CPU_USAGE], cpu_percent, timestamp, system)
             
             # Memory metrics
-            memory = psutil.virtual_memory()
-            metrics.append(PerformanceMetric(
-                name=PerformanceMetricType.MEMORY_USAGE,
-                value=memory.percent,
-                unit="percent",
-                timestamp=timestamp,
-                component="system",
-                metadata={
-                    "available_gb": round(memory.available / (1024**3), 2),
-                    "total_gb": round(memory.total / (1024**3), 2)
-                }
-            ))
+            self._emit(*ids[PerformanceMetricType.MEMORY_USAGE], memory_percent, timestamp, system, {
+                "available_gb": round(memory_available / (1024**3), 2),
+                "total_gb": round(memory_total / (1024**3), 2)
+            })
             
             # System load
-            if hasattr(psutil, 'getloadavg'):
-                load_avg = psutil.getloadavg()[0]  # 1-minute load average
-                metrics.append(PerformanceMetric(
-                    name="system_load",
-                    value=load_avg,
-                    unit="load",
-                    timestamp=timestamp,
-                    component="system"
-                ))
-            
-            # Disk I/O
-            disk_io = psutil.disk_io_counters()
-            if disk_io:
-                metrics.append(PerformanceMetric(
-                    name="disk_read_rate",
-                    value=disk_io.read_bytes,
-                    unit="bytes",
-                    timestamp=timestamp,
-                    component="system"
-                ))
-                metrics.append(PerformanceMetric(
-                    name="disk_write_rate",
-                    value=disk_io.write_bytes,
-                    unit="bytes",
-                    timestamp=timestamp,
-                    component="system"
-                ))
+            if load_avg is not None:
+                self._emit(*ids["system_load"], load_avg, timestamp, system)
             
-            # Network I/O
-            network_io = psutil.net_io_counters()
-            if network_io:
-                metrics.append(PerformanceMetric(
-                    name="network_sent",
-                    value=network_io.bytes_sent,
-                    unit="bytes",
-                    timestamp=timestamp,
-                    component="system"
-                ))
-                metrics.append(PerformanceMetric(
-                    name="network_received",
-                    value=network_io.bytes_recv,
-                    unit="bytes",
-                    timestamp=timestamp,
-                    component="system"
-                ))
+            # Disk and network I/O rates since the previous tick; idle counters are skipped
+            counters = (disk_read, disk_write, net_sent, net_recv)
+            previous = self._prev_io
+            self._prev_io = (timestamp, counters)
+            if previous is not None and timestamp > previous[0]:
+                elapsed = (timestamp - previous[0]) / 1e9
+                for name, current, before in zip(IO_RATE_METRICS, counters, previous[1]):
+                    if current is None or before is None:
+                        continue
+                    rate = (current - before) / elapsed
+                    if rate >= IO_RATE_MIN:
+                        self._emit(*ids[name], rate, timestamp, system)
             
         except Exception as e:
             logger.error(f"Error collecting system metrics: {e}")
         
-        return metrics
+        return self._written - written
+    
+    def _snapshot(self) -> Tuple[int, int]:
+        """Consistent (head, count) view of the ring from one read of the write counter"""
+        written = self._written
+        return written & self._index_mask, min(written, self._capacity)
+    
+    @property
+    def metrics_count(self) -> int:
+        """Number of metrics currently held in the buffer"""
+        return min(self._written, self._capacity)
+    
+    @property
+    def metrics_buffer(self) -> List[PerformanceMetric]:
+        """All buffered metrics, oldest first (materialized on demand)"""
+        return self._materialize(self._ordered_slots())
+    
+    def latest_timestamp(self) -> Optional[datetime]:
+        """Timestamp of the newest buffered metric"""
+        # The newest metric sits just behind the write head
+        written = self._written
+        if not written:
+            return None
+        return _ns_to_datetime(int(self._ts[(written - 1) & self._index_mask]))
+    
+    def metric_name(self, name_id: int) -> str:
+        """Resolve an interned metric name id"""
+        return self._names[name_id]
+    
+    @staticmethod
+    def _intern(table: Dict[str, int], values: List[str], value: str) -> int:
+        value_id = table.get(value)
+        if value_id is None:
+            value_id = len(values)
+            values.append(value)
+            table[value] = value_id
+        return value_id
+    
+    def record(self, metric: PerformanceMetric):
+        """Append a metric to the ring buffer, overwriting the oldest when full"""
+        self._emit(
+            self._intern(self._name_table, self._names, metric.name),
+            self._intern(self._unit_table, self._units, metric.unit),
+            metric.value,
+            metric.timestamp,
+            self._intern(self._component_table, self._components, metric.component),
+            metric.metadata
+        )
+    
+    def _emit(self, name_id: int, unit_id: int, value: float, timestamp: int,
+              component_id: int, metadata: Optional[Dict[str, Any]] = None):
+        """Write one metric's columns into the next ring slot and publish it"""
+        slot = self._written & self._index_mask
+        self._ts[slot] = timestamp
+        self._val[slot] = value
+        self._name_id[slot] = name_id
+        self._component_id[slot] = component_id
+        self._unit_id[slot] = unit_id
+        self._metadata[slot] = metadata
+        
+        # Publish the slot to readers
+        self._written += 1
+    
+    def _ordered_slots(self) -> np.ndarray:
+        """Buffer slot indices in chronological order"""
+        head, count = self._snapshot()
+        if count < self._capacity:
+            return np.arange(count)
+        return np.concatenate((np.arange(head, self._capacity), np.arange(head)))
+    
+    def _recent_slots(self, minutes: int) -> np.ndarray:
+        """Chronologically ordered slots recorded within the last `minutes`"""
+        cutoff_ns = time.time_ns() - minutes * NS_PER_MINUTE
+        head, count = self._snapshot()
+        
+        # Timestamps are appended in order, so binary search for the cutoff
+        if count < self._capacity:
+            start = int(np.searchsorted(self._ts[:count], cutoff_ns))
+            return np.arange(start, count)
+        
+        # Full ring: [head, capacity) holds the older half, [0, head) the newer
+        start = int(np.searchsorted(self._ts[head:], cutoff_ns)) + head
+        if start < self._capacity:
+            return np.concatenate((np.arange(start, self._capacity), np.arange(head)))
+        return np.arange(int(np.searchsorted(self._ts[:head], cutoff_ns)), head)
+    
+    def _materialize(self, slots: np.ndarray) -> List[PerformanceMetric]:
+        # Copy the columns out first so object construction works on reader-owned data
+        names, components, units = self._names, self._components, self._units
+        return [
+            PerformanceMetric(
+                name=names[name_id],
+                value=value,
+                unit=units[unit_id],
+                timestamp=timestamp,
+                component=components[component_id],
+                metadata=metadata
+            )
+            for name_id, value, unit_id, timestamp, component_id, metadata in zip(
+                self._name_id[slots].tolist(), self._val[slots].tolist(), self._unit_id[slots].tolist(),
+                self._ts[slots].tolist(), self._component_id[slots].tolist(), self._metadata[slots].tolist()
+            )
+        ]
+    
+    def get_recent_values(self, minutes: int = 60) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Recent (timestamps_ns, name_ids, values) columns, oldest first"""
+        slots = self._recent_slots(minutes)
+        return self._ts[slots], self._name_id[slots], self._val[slots]
     
     def get_recent_metrics(self, metric_name: str = None,
                           component: str = None,
                           minutes: int = 60) -> List[PerformanceMetric]:
         """Get recent metrics matching criteria"""
-        cutoff_time = datetime.utcnow() - timedelta(minutes=minutes)
+        slots = self._recent_slots(minutes)
         
-        filtered_metrics = []
-        for metric in self.metrics_buffer:
-            if metric.timestamp < cutoff_time:
-                continue
-            
-            if metric_name and metric.name != metric_name:
-                continue
-            
-            if component and metric.component != component:
-                continue
-            
-            filtered_metrics.append(metric)
+        if metric_name:
+            name_id = self._name_table.get(metric_name)
+            if name_id is None:
+                return []
+            slots = slots[self._name_id[slots] == name_id]
+        
+        if component:
+            component_id = self._component_table.get(component)
+            if component_id is None:
+                return []
+            slots = slots[self._component_id[slots] == component_id]
         
-        return filtered_metrics
+        return self._materialize(slots)
 
 
 class PerformanceAnalyzer:
@@ -227,7 +547,20 @@ class PerformanceAnalyzer:
     
     def __init__(self, collector: PerformanceCollector):
         self.collector = collector
-        self.benchmarks = deque(maxlen=500)  # Store recent benchmarks
+        
+        # Recent benchmarks ring buffer stored as parallel columns
+        self._bench_capacity = BENCHMARK_BUFFER_SIZE
+        self._bench_agent = np.empty(self._bench_capacity, dtype=object)
+        self._bench_complexity = np.empty(self._bench_capacity, dtype=object)
+        self._bench_model = np.empty(self._bench_capacity, dtype=object)
+        self._bench_speed = np.zeros(self._bench_capacity, dtype=np.float64)
+        self._bench_time = np.zeros(self._bench_capacity, dtype=np.float64)
+        self._bench_memory = np.zeros(self._bench_capacity, dtype=np.float64)
+        self._bench_cpu = np.zeros(self._bench_capacity, dtype=np.float64)
+        self._bench_quality = np.zeros(self._bench_capacity, dtype=np.float64)
+        self._bench_ts = np.zeros(self._bench_capacity, dtype=np.int64)  # epoch nanoseconds
+        self._bench_head = 0
+        self._bench_count = 0
         
         # Performance thresholds
         self.thresholds = {
@@ -237,6 +570,17 @@ class PerformanceAnalyzer:
             PerformanceMetricType.TASK_COMPLETION_TIME: {"good": 30, "fair": 60, "poor": 120},  # seconds
             PerformanceMetricType.ERROR_RATE: {"good": 5, "fair": 10, "poor": 20},  # percent
         }
+        
+        # Thresholds as a table indexed by metric type id. Rows for metrics where
+        # higher is better are negated so every comparison becomes `value <= threshold`
+        higher_is_better = {PerformanceMetricType.INFERENCE_SPEED}
+        self._threshold_ids = {metric_type: i for i, metric_type in enumerate(self.thresholds)}
+        self._threshold_sign = np.array(
+            [-1.0 if metric_type in higher_is_better else 1.0 for metric_type in self.thresholds]
+        )
+        self._threshold_table = np.array(
+            [[t["good"], t["fair"], t["poor"]] for t in self.thresholds.values()], dtype=np.float64
+        ) * self._threshold_sign[:, None]
     
     def analyze_current_performance(self) -> Dict[str, Any]:
         """Analyze current system performance"""
@@ -250,33 +594,39 @@ class PerformanceAnalyzer:
         }
         
         # Get recent metrics (last 5 minutes)
-        recent_metrics = self.collector.get_recent_metrics(minutes=5)
-        
-        if not recent_metrics:
+        if not self.collector.metrics_count:
             analysis["error"] = "No recent metrics available"
             return analysis
         
-        # Group metrics by type
-        metrics_by_type = defaultdict(list)
-        for metric in recent_metrics:
-            metrics_by_type[metric.name].append(metric.value)
+        # Group metrics by type: per-name counts, sums and value runs in one pass
+        _, name_ids, values_column = self.collector.get_recent_values(minutes=5)
+        counts = np.bincount(name_ids)
+        means = np.bincount(name_ids, weights=values_column) / np.maximum(counts, 1)
+        grouped = np.split(values_column[np.argsort(name_ids, kind="stable")], np.cumsum(counts)[:-1])
+        
+        # Metric types in order of first appearance
+        present, first_seen = np.unique(name_ids, return_index=True)
+        present = present[np.argsort(first_seen)]
+        metric_types = [self.collector.metric_name(name_id) for name_id in present.tolist()]
+        
+        # Score every metric type in one comparison against the threshold table
+        hits = self._threshold_hits(metric_types, means[present])
         
         scores = []
         
         # Analyze each metric type
-        for metric_type, values in metrics_by_type.items():
-            if not values:
-                continue
+        for metric_type, name_id, hit in zip(metric_types, present.tolist(), hits.tolist()):
+            values = grouped[name_id]
             
-            avg_value = statistics.mean(values)
+            avg_value = float(means[name_id])
             analysis["metrics"][metric_type] = {
                 "current": avg_value,
                 "trend": self._calculate_trend(values),
-                "level": self._assess_metric_level(metric_type, avg_value)
+                "level": THRESHOLD_LEVELS[hit]
             }
             
             # Calculate score for this metric
-            score = self._calculate_metric_score(metric_type, avg_value)
+            score = float(THRESHOLD_SCORES[hit])
             scores.append(score)
             
             # Check for bottlenecks
@@ -287,7 +637,7 @@ class PerformanceAnalyzer:
         
         # Calculate overall score
         if scores:
-            analysis["overall_score"] = statistics.mean(scores)
+            analysis["overall_score"] = sum(scores) / len(scores)
             analysis["level"] = self._get_performance_level(analysis["overall_score"])
         
         # Generate recommendations
@@ -301,42 +651,50 @@ class PerformanceAnalyzer:
         from backend.models import Task, TaskStatus
         
         week_ago = datetime.utcnow() - timedelta(days=7)
-        recent_tasks = db.query(Task).filter(
+        
+        # Task duration in seconds (NULL when the task never recorded a start)
+        if db.get_bind().dialect.name == "postgresql":
+            duration = func.extract('epoch', Task.completed_at - Task.started_at)
+        else:
+            # julianday() resolves to milliseconds; round away the float noise
+            duration = func.round(
+                (func.julianday(Task.completed_at) - func.julianday(Task.started_at)) * 86400, 3
+            )
+        
+        # Aggregate the week's tasks in a single row instead of loading them
+        (total_tasks, time_count, time_avg, time_square_sum,
+         avg_effort, success_rate) = db.query(
+            func.count(Task.id),
+            func.count(duration),
+            func.avg(duration),
+            func.sum(duration * duration),
+            func.avg(func.nullif(Task.actual_effort, 0)),
+            func.avg(case((Task.status == TaskStatus.COMPLETED, 1), else_=0))
+        ).filter(
             and_(
                 Task.agent_id == agent_id,
                 Task.completed_at >= week_ago,
                 Task.status == TaskStatus.COMPLETED
             )
-        ).all()
+        ).one()
         
-        if not recent_tasks:
+        if not total_tasks:
             return {
                 "agent_id": agent_id,
                 "error": "No completed tasks in the last week"
             }
         
-        # Calculate performance metrics
-        completion_times = []
-        effort_hours = []
-        success_rate_data = []
-        
-        for task in recent_tasks:
-            if task.started_at and task.completed_at:
-                duration = (task.completed_at - task.started_at).total_seconds()
-                completion_times.append(duration)
-            
-            if task.actual_effort:
-                effort_hours.append(task.actual_effort)
-            
-            success_rate_data.append(1 if task.status == TaskStatus.COMPLETED else 0)
+        # Completion-time mean and sum of squared deviations over the same week
+        time_mean = float(time_avg or 0)
+        time_m2 = max(float(time_square_sum or 0) - time_count * time_mean * time_mean, 0.0)
         
         analysis = {
             "agent_id": agent_id,
             "period": "last_7_days",
-            "total_tasks": len(recent_tasks),
-            "avg_completion_time": statistics.mean(completion_times) if completion_times else 0,
-            "avg_effort_hours": statistics.mean(effort_hours) if effort_hours else 0,
-            "success_rate": statistics.mean(success_rate_data) if success_rate_data else 0,
+            "total_tasks": total_tasks,
+            "avg_completion_time": time_mean if time_count else 0,
+            "avg_effort_hours": float(avg_effort) if avg_effort is not None else 0,
+            "success_rate": float(success_rate or 0),
             "performance_score": 0,
             "level": PerformanceLevel.POOR,
             "trends": {},
@@ -351,7 +709,7 @@ class PerformanceAnalyzer:
         score_components.append(success_score)
         
         # Speed score (0-30 points)
-        if completion_times:
+        if time_count:
             avg_time = analysis["avg_completion_time"]
             if avg_time <= 30:
                 speed_score = 30
@@ -364,9 +722,8 @@ class PerformanceAnalyzer:
             score_components.append(speed_score)
         
         # Consistency score (0-30 points)
-        if len(completion_times) > 1:
-            time_std = statistics.stdev(completion_times)
-            time_mean = statistics.mean(completion_times)
+        if time_count > 1:
+            time_std = math.sqrt(time_m2 / (time_count - 1))
             cv = time_std / time_mean if time_mean > 0 else 1
             
             if cv <= 0.2:
@@ -391,14 +748,14 @@ class PerformanceAnalyzer:
                        model_name: str, task_complexity: str) -> PerformanceBenchmark:
         """Create a performance benchmark for an agent task"""
         start_time = time.time()
-        start_memory = psutil.virtual_memory().used
-        start_cpu = psutil.cpu_percent()
+        start_memory = _cached_psutil("virtual_memory", psutil.virtual_memory).used
+        start_cpu = _cached_psutil("cpu_percent", psutil.cpu_percent)
         
         # This would be called at the end of task processing
         def finish_benchmark(quality_score: float = 0.8) -> PerformanceBenchmark:
             end_time = time.time()
-            end_memory = psutil.virtual_memory().used
-            end_cpu = psutil.cpu_percent()
+            end_memory = _cached_psutil("virtual_memory", psutil.virtual_memory).used
+            end_cpu = _cached_psutil("cpu_percent", psutil.cpu_percent)
             
             completion_time = end_time - start_time
             memory_used = (end_memory - start_memory) / (1024 * 1024)  # MB
@@ -419,10 +776,10 @@ class PerformanceAnalyzer:
                 memory_usage=memory_used,
                 cpu_usage=avg_cpu,
                 quality_score=quality_score,
-                timestamp=datetime.utcnow()
+                timestamp=time.time_ns()
             )
             
-            self.benchmarks.append(benchmark)
+            self._record_benchmark(benchmark)
             
             logger.info(f"Agent {agent_id} benchmark: {completion_time:.2f}s, "
                        f"{inference_speed:.1f} tokens/sec, {memory_used:.1f}MB")
@@ -431,55 +788,104 @@ class PerformanceAnalyzer:
         
         return finish_benchmark
     
+    @property
+    def benchmarks(self) -> List[PerformanceBenchmark]:
+        """Recent benchmarks, oldest first (materialized on demand)"""
+        if self._bench_count < self._bench_capacity:
+            slots = range(self._bench_count)
+        else:
+            slots = [*range(self._bench_head, self._bench_capacity), *range(self._bench_head)]
+        return [
+            PerformanceBenchmark(
+                agent_id=self._bench_agent[slot],
+                task_complexity=self._bench_complexity[slot],
+                model_name=self._bench_model[slot],
+                inference_speed=float(self._bench_speed[slot]),
+                completion_time=float(self._bench_time[slot]),
+                memory_usage=float(self._bench_memory[slot]),
+                cpu_usage=float(self._bench_cpu[slot]),
+                quality_score=float(self._bench_quality[slot]),
+                timestamp=int(self._bench_ts[slot])
+            )
+            for slot in slots
+        ]
+    
+    def _record_benchmark(self, benchmark: PerformanceBenchmark):
+        """Append a benchmark, overwriting the oldest when the ring is full"""
+        slot = self._bench_head
+        self._bench_agent[slot] = benchmark.agent_id
+        self._bench_complexity[slot] = benchmark.task_complexity
+        self._bench_model[slot] = benchmark.model_name
+        self._bench_speed[slot] = benchmark.inference_speed
+        self._bench_time[slot] = benchmark.completion_time
+        self._bench_memory[slot] = benchmark.memory_usage
+        self._bench_cpu[slot] = benchmark.cpu_usage
+        self._bench_quality[slot] = benchmark.quality_score
+        self._bench_ts[slot] = benchmark.timestamp
+        
+        self._bench_head = (slot + 1) % self._bench_capacity
+        if self._bench_count < self._bench_capacity:
+            self._bench_count += 1
+    
     def get_performance_trends(self, hours: int = 24) -> Dict[str, Any]:
         """Get performance trends over time"""
-        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-        recent_metrics = [m for m in self.collector.metrics_buffer if m.timestamp >= cutoff_time]
+        timestamps, name_ids, values = self.collector.get_recent_values(minutes=hours * 60)
         
-        if not recent_metrics:
+        if not len(values):
             return {"error": "No metrics available for trend analysis"}
         
-        # Group metrics by hour
-        hourly_data = defaultdict(lambda: defaultdict(list))
+        # Accumulate per-(hour, metric name) statistics into pre-sized 2-D grids
+        hour_ids = timestamps // NS_PER_HOUR
+        first_hour = int(hour_ids[0])
+        hour_idx = hour_ids - first_hour
+        cells = (hour_idx, name_ids)
+        shape = (int(hour_idx[-1]) + 1, int(name_ids.max()) + 1)
         
-        for metric in recent_metrics:
-            hour_key = metric.timestamp.replace(minute=0, second=0, microsecond=0)
-            hourly_data[hour_key][metric.name].append(metric.value)
+        sums = np.zeros(shape)
+        maxima = np.full(shape, -np.inf)
+        minima = np.full(shape, np.inf)
+        counts = np.zeros(shape, dtype=np.int64)
+        np.add.at(sums, cells, values)
+        np.maximum.at(maxima, cells, values)
+        np.minimum.at(minima, cells, values)
+        np.add.at(counts, cells, 1)
         
         # Calculate trends
         trends = {}
-        for hour, metrics in sorted(hourly_data.items()):
-            hour_str = hour.isoformat()
-            trends[hour_str] = {}
-            
-            for metric_name, values in metrics.items():
-                trends[hour_str][metric_name] = {
-                    "avg": statistics.mean(values),
-                    "max": max(values),
-                    "min": min(values),
-                    "count": len(values)
-                }
+        hour_offsets, cell_names = np.nonzero(counts)
+        for hour_offset, name_id, total, high, low, count in zip(
+            hour_offsets.tolist(), cell_names.tolist(),
+            sums[hour_offsets, cell_names].tolist(), maxima[hour_offsets, cell_names].tolist(),
+            minima[hour_offsets, cell_names].tolist(), counts[hour_offsets, cell_names].tolist()
+        ):
+            hour_id = first_hour + hour_offset
+            hour_str = _ns_to_datetime(hour_id * NS_PER_HOUR).isoformat()
+            trends.setdefault(hour_str, {})[self.collector.metric_name(name_id)] = {
+                "avg": total / count,
+                "max": high,
+                "min": low,
+                "count": count
+            }
         
         return {
             "period_hours": hours,
-            "data_points": len(recent_metrics),
+            "data_points": len(values),
             "trends": trends,
             "summary": self._summarize_trends(trends)
         }
     
-    def _calculate_trend(self, values: List[float]) -> str:
+    def _calculate_trend(self, values) -> str:
         """Calculate trend direction from a series of values"""
-        if len(values) < 2:
+        n = len(values)
+        if n < 2:
             return "stable"
         
-        # Simple linear trend
-        n = len(values)
-        x_sum = sum(range(n))
-        y_sum = sum(values)
-        xy_sum = sum(i * values[i] for i in range(n))
-        x2_sum = sum(i * i for i in range(n))
+        # Simple linear trend; x = 0..n-1 so its moments are closed-form
+        values = np.asarray(values, dtype=np.float64)
+        x_sum = n * (n - 1) / 2
+        xy_sum = float(np.arange(n) @ values)
         
-        slope = (n * xy_sum - x_sum * y_sum) / (n * x2_sum - x_sum * x_sum)
+        slope = (n * xy_sum - x_sum * float(values.sum())) / (n * n * (n * n - 1) / 12)
         
         if abs(slope) < 0.1:
             return "stable"
@@ -488,69 +894,13 @@ class PerformanceAnalyzer:
         else:
             return "decreasing"
     
-    def _assess_metric_level(self, metric_type: str, value: float) -> PerformanceLevel:
-        """Assess the performance level for a specific metric"""
-        if metric_type not in self.thresholds:
-            return PerformanceLevel.GOOD
-        
-        thresholds = self.thresholds[metric_type]
-        
-        # For metrics where lower is better (like CPU usage, completion time)
-        if metric_type in [PerformanceMetricType.CPU_USAGE,
-                          PerformanceMetricType.MEMORY_USAGE,
-                          PerformanceMetricType.TASK_COMPLETION_TIME,
-                          PerformanceMetricType.ERROR_RATE]:
-            if value <= thresholds["good"]:
-                return PerformanceLevel.EXCELLENT
-            elif value <= thresholds["fair"]:
-                return PerformanceLevel.GOOD
-            elif value <= thresholds["poor"]:
-                return PerformanceLevel.FAIR
-            else:
-                return PerformanceLevel.POOR
-        
-        # For metrics where higher is better (like inference speed)
-        else:
-            if value >= thresholds["good"]:
-                return PerformanceLevel.EXCELLENT
-            elif value >= thresholds["fair"]:
-                return PerformanceLevel.GOOD
-            elif value >= thresholds["poor"]:
-                return PerformanceLevel.FAIR
-            else:
-                return PerformanceLevel.POOR
-    
-    def _calculate_metric_score(self, metric_type: str, value: float) -> float:
-        """Calculate a 0-100 score for a metric"""
-        if metric_type not in self.thresholds:
-            return 75.0  # Default score
-        
-        thresholds = self.thresholds[metric_type]
-        
-        # For metrics where lower is better
-        if metric_type in [PerformanceMetricType.CPU_USAGE,
-                          PerformanceMetricType.MEMORY_USAGE,
-                          PerformanceMetricType.TASK_COMPLETION_TIME,
-                          PerformanceMetricType.ERROR_RATE]:
-            if value <= thresholds["good"]:
-                return 100.0
-            elif value <= thresholds["fair"]:
-                return 75.0
-            elif value <= thresholds["poor"]:
-                return 50.0
-            else:
-                return 25.0
-        
-        # For metrics where higher is better
-        else:
-            if value >= thresholds["good"]:
-                return 100.0
-            elif value >= thresholds["fair"]:
-                return 75.0
-            elif value >= thresholds["poor"]:
-                return 50.0
-            else:
-                return 25.0
+    def _threshold_hits(self, metric_types: List[str], values) -> np.ndarray:
+        """Number of thresholds met by each value (0-3), or -1 without thresholds"""
+        rows = np.array([self._threshold_ids.get(metric_type, -1) for metric_type in metric_types],
+                        dtype=np.intp)
+        signed = np.asarray(values, dtype=np.float64) * self._threshold_sign[rows]
+        hits = np.count_nonzero(signed[:, None] <= self._threshold_table[rows], axis=1)
+        return np.where(rows >= 0, hits, -1)
     
     def _get_performance_level(self, score: float) -> PerformanceLevel:
         """Convert numeric score to performance level"""
@@ -736,8 +1086,8 @@ class PerformanceMonitor:
         """Get current performance status"""
         return {
             "monitoring_active": self.monitoring_active,
-            "metrics_collected": len(self.collector.metrics_buffer),
-            "last_collection": max([m.timestamp for m in self.collector.metrics_buffer]) if self.collector.metrics_buffer else None,
+            "metrics_collected": self.collector.metrics_count,
+            "last_collection": self.collector.latest_timestamp(),
             "analysis": self.analyzer.analyze_current_performance()
         }
     
@@ -754,16 +1104,18 @@ class PerformanceMonitor:
     
     async def _get_system_snapshot(self) -> SystemPerformanceSnapshot:
         """Get current system performance snapshot"""
+        # One batched read of the system counters instead of separate psutil calls
+        cpu_usage, memory_usage, _, _, load_avg, *_ = await asyncio.to_thread(self.collector.sample_system)
         return SystemPerformanceSnapshot(
             timestamp=datetime.utcnow(),
-            cpu_usage=psutil.cpu_percent(),
-            memory_usage=psutil.virtual_memory().percent,
+            cpu_usage=cpu_usage,
+            memory_usage=memory_usage,
             memory_pressure="normal",  # This would be determined by system-specific checks
             active_tasks=0,  # This would be queried from task database
             completed_tasks_last_hour=0,  # This would be queried from task database
             average_response_time=0.0,  # This would be calculated from recent metrics
             error_rate=0.0,  # This would be calculated from recent error logs
-            system_load=psutil.getloadavg()[0] if hasattr(psutil, 'getloadavg') else 0.0
+            system_load=load_avg if load_avg is not None else 0.0
         )
     
     def _get_optimization_recommendations(self) -> List[str]:
@@ -804,10 +1156,10 @@ def log_performance_metric(name: str, value: float, unit: str, component: str =
         name=name,
         value=value,
         unit=unit,
-        timestamp=datetime.utcnow(),
+        timestamp=time.time_ns(),
         component=component
     )
-    monitor.collector.metrics_buffer.append(metric)
+    monitor.collector.record(metric)
 
 
 async def get_performance_status() -> Dict[str, Any]:
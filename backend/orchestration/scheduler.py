@@ -1,23 +1,37 @@
 # VirtuAI Office - Advanced Task Scheduler & Orchestrator
 import asyncio
 import heapq
+import itertools
+import sys
 import uuid
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Callable, Any, Set, Tuple
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Callable, Any, Set, Tuple, FrozenSet
 from enum import Enum
 from dataclasses import dataclass, field
 from concurrent.futures import ThreadPoolExecutor
 import logging
 from collections import defaultdict, deque
+from operator import attrgetter
 import time
 import json
 
+import numpy as np
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
+from sortedcontainers import SortedKeyList
 
 from ..core.logging import get_logger, log_performance_warning
 from ..models.database import Task, Agent, TaskStatus, TaskPriority, AgentType
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+# Slotted dataclasses where supported (the slots flag is Python 3.10+)
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
 
 class SchedulerMode(str, Enum):
     FIFO = "fifo"  # First In, First Out
@@ -27,6 +41,101 @@ class SchedulerMode(str, Enum):
     SMART = "smart"  # AI-powered intelligent scheduling
 
 
+# Bits reserved for the scheduled-time microseconds below the priority in sort keys
+SORT_KEY_PRIORITY_SHIFT = 52
+
+# Numeric priority used for queue ordering
+_PRIORITY_MAP: Dict[TaskPriority, int] = {
+    TaskPriority.LOW: 1,
+    TaskPriority.MEDIUM: 2,
+    TaskPriority.HIGH: 3,
+    TaskPriority.URGENT: 4
+}
+
+# Callbacks of one event kind allowed to run at once
+MAX_CONCURRENT_CALLBACKS = 8
+
+# Offset for earliest-deadline-first keys, below every priority-ordered key
+DEADLINE_SORT_KEY_BASE = -(1 << 60)
+
+NS_PER_HOUR = 3_600_000_000_000
+
+_EPOCH = datetime(1970, 1, 1)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+def _datetime_to_ns(value: datetime) -> int:
+    """Datetime to integer epoch nanoseconds; naive values are taken as UTC"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // _ONE_MICROSECOND * 1000
+
+
+def _ns_to_datetime(value: int) -> datetime:
+    """Integer epoch nanoseconds to naive UTC datetime"""
+    return _EPOCH + timedelta(microseconds=value // 1000)
+
+
+def _task_sort_key(priority: int, scheduled_time_ns: int) -> int:
+    """Single integer queue key: higher priority first, then earlier scheduled time"""
+    return (-priority << SORT_KEY_PRIORITY_SHIFT) + scheduled_time_ns // 1000
+
+
+def _deadline_sort_key(deadline_ns: int) -> int:
+    """Earliest-deadline-first queue key, ahead of all tasks without a deadline"""
+    return DEADLINE_SORT_KEY_BASE + deadline_ns // 1000
+
+
+# Description substrings that mark a task for a specialization
+TASK_KEYWORDS: Tuple[Tuple[str, str], ...] = (
+    ('react', 'frontend'), ('frontend', 'frontend'),
+    ('api', 'backend'), ('backend', 'backend'),
+    ('design', 'design'), ('ui', 'design'), ('ux', 'design'),
+    ('test', 'testing'), ('qa', 'testing'),
+    ('product', 'product'), ('requirement', 'product'),
+)
+
+
+# Specialization keyword -> small integer id, shared by every scheduler
+_KEYWORD_IDS: Dict[str, int] = {}
+
+_NO_KEYWORDS = np.zeros(0, dtype=np.int32)
+_NO_KEYWORDS.flags.writeable = False
+
+
+def _keyword_id(keyword: str) -> int:
+    """Intern a specialization keyword"""
+    keyword_id = _KEYWORD_IDS.get(keyword)
+    if keyword_id is None:
+        keyword_id = _KEYWORD_IDS[keyword] = len(_KEYWORD_IDS)
+    return keyword_id
+
+
+def _build_keyword_matcher() -> Callable[[str], np.ndarray]:
+    """Build a single-pass matcher from lowercased text to sorted specialization ids.
+    
+    Uses an Aho-Corasick automaton when pyahocorasick is installed and falls
+    back to one substring test per keyword otherwise.
+    """
+    keyword_ids = [(keyword, _keyword_id(specialization)) for keyword, specialization in TASK_KEYWORDS]
+    
+    def to_array(ids: Set[int]) -> np.ndarray:
+        return np.array(sorted(ids), dtype=np.int32) if ids else _NO_KEYWORDS
+    
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for keyword, keyword_id in keyword_ids:
+            automaton.add_word(keyword, keyword_id)
+        automaton.make_automaton()
+        
+        return lambda text: to_array({value for _, value in automaton.iter(text)})
+    
+    return lambda text: to_array({keyword_id for keyword, keyword_id in keyword_ids if keyword in text})
+
+
+_match_task_keywords = _build_keyword_matcher()
+
+
 class TaskExecutionState(str, Enum):
     QUEUED = "queued"
     SCHEDULED = "scheduled"
@@ -37,13 +146,13 @@ class TaskExecutionState(str, Enum):
     RETRYING = "retrying"
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class ScheduledTask:
     """Represents a task in the scheduler queue"""
     task_id: str
     priority: int
-    scheduled_time: datetime
-    deadline: Optional[datetime] = None
+    scheduled_time_ns: int  # Epoch nanoseconds
+    deadline_ns: Optional[int] = None
     dependencies: Set[str] = field(default_factory=set)
     agent_requirements: Set[AgentType] = field(default_factory=set)
     estimated_duration: Optional[int] = None  # minutes
@@ -51,15 +160,21 @@ class ScheduledTask:
     max_retries: int = 3
     state: TaskExecutionState = TaskExecutionState.QUEUED
     metadata: Dict[str, Any] = field(default_factory=dict)
+    pending_deps: int = 0  # Dependencies not yet completed; queued only at zero
+    # Interned specialization keywords, extracted once
+    keyword_ids: np.ndarray = field(default_factory=lambda: _NO_KEYWORDS, compare=False)
+    result: Any = None  # Return value of the agent runner
+    sort_key: int = field(init=False)
+    
+    def __post_init__(self):
+        self.sort_key = _task_sort_key(self.priority, self.scheduled_time_ns)
     
     def __lt__(self, other):
         """For heap ordering - higher priority and earlier time comes first"""
-        if self.priority != other.priority:
-            return self.priority > other.priority  # Higher priority first
-        return self.scheduled_time < other.scheduled_time
+        return self.sort_key < other.sort_key
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class AgentResource:
     """Represents an agent's current resource state"""
     agent_id: str
@@ -95,7 +210,9 @@ class TaskScheduler:
         self.scheduler_interval = scheduler_interval
         
         # Task queues
-        self.task_queue: List[ScheduledTask] = []  # Priority heap
+        self.task_queue: SortedKeyList = SortedKeyList(key=attrgetter('sort_key'))
+        self.queued_index: Dict[str, ScheduledTask] = {}  # task_id -> live queued entry
+        self.blocked: Dict[str, ScheduledTask] = {}  # Waiting on dependencies, not in the heap
         self.executing_tasks: Dict[str, ScheduledTask] = {}
         self.completed_tasks: Dict[str, ScheduledTask] = {}
         self.failed_tasks: Dict[str, ScheduledTask] = {}
@@ -103,10 +220,28 @@ class TaskScheduler:
         # Agent management
         self.agents: Dict[str, AgentResource] = {}
         self.agent_assignments: Dict[str, str] = {}  # task_id -> agent_id
+        self.agent_runners: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+        self.agents_by_type: Dict[AgentType, List[AgentResource]] = defaultdict(list)
+        
+        # Scoring state as columns indexed by agent slot; specialization columns
+        # are indexed by interned keyword id
+        self._agent_slots: Dict[str, int] = {}
+        self._free_slots: List[int] = []
+        self._agent_perf = np.zeros(8)
+        self._agent_util = np.zeros(8)
+        self._agent_spec = np.zeros((8, 0), dtype=np.float32)
+        self._available_agents: Set[str] = set()  # Kept by _push_agent, for O(1) counts
+        
+        # Agents ordered by utilization: (utilization_rate, seq, agent_id). Entries
+        # are pushed on every load change; only each agent's latest seq is live
+        self.agent_heap: List[Tuple[float, int, str]] = []
+        self._agent_heap_seq: Dict[str, int] = {}
+        self._agent_heap_counter = itertools.count()
         
         # Dependency management
         self.task_dependencies: Dict[str, Set[str]] = defaultdict(set)
         self.dependency_graph: Dict[str, Set[str]] = defaultdict(set)
+        self._closure_cache: Dict[str, FrozenSet[str]] = {}  # task_id -> transitive dependents
         
         # Performance tracking
         self.metrics = {
@@ -119,17 +254,27 @@ class TaskScheduler:
             'agent_utilization': {}
         }
         
+        # Epoch-aligned monotonic clock; the loop caches one reading per tick
+        self._epoch_offset_ns = time.time_ns() - time.monotonic_ns()
+        self._tick_now_ns = self._now_ns()
+        
         # Scheduler state
         self.is_running = False
         self.scheduler_task = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None  # Cached by start()
+        self._tick_handle: Optional[asyncio.TimerHandle] = None
         self.logger = get_logger('virtuai.scheduler')
         
         # Callback handlers
         self.task_started_callbacks: List[Callable] = []
         self.task_completed_callbacks: List[Callable] = []
         self.task_failed_callbacks: List[Callable] = []
+        self._callback_limits = {
+            kind: asyncio.Semaphore(MAX_CONCURRENT_CALLBACKS)
+            for kind in ('started', 'completed', 'failed')
+        }
         
-        # Thread pool for task execution
+        # Thread pool for agent runners; threads start on demand up to the cap
         self.executor = ThreadPoolExecutor(max_workers=max_concurrent_tasks)
     
     async def start(self):
@@ -138,7 +283,8 @@ class TaskScheduler:
             return
         
         self.is_running = True
-        self.scheduler_task = asyncio.create_task(self._scheduler_loop())
+        self._loop = asyncio.get_running_loop()
+        self._tick_handle = self._loop.call_soon(self._start_tick)
         self.logger.info(f"Task scheduler started in {self.mode.value} mode")
     
     async def stop(self):
@@ -148,6 +294,10 @@ class TaskScheduler:
         
         self.is_running = False
         
+        if self._tick_handle:
+            self._tick_handle.cancel()
+            self._tick_handle = None
+        
         if self.scheduler_task:
             self.scheduler_task.cancel()
             try:
@@ -168,15 +318,29 @@ class TaskScheduler:
                       agent_id: str,
                       agent_type: AgentType,
                       max_capacity: int = 3,
-                      specializations: Dict[str, float] = None):
-        """Register an agent with the scheduler"""
+                      specializations: Dict[str, float] = None,
+                      runner: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        """Register an agent with the scheduler
+        
+        ``runner`` receives the task metadata and does the agent's work. Plain
+        callables run on the scheduler's thread pool; coroutine functions are
+        awaited on the event loop.
+        """
+        if runner is not None:
+            self.agent_runners[agent_id] = runner
+        else:
+            self.agent_runners.pop(agent_id, None)
+        if agent_id in self.agents:
+            self._remove_from_type_bucket(self.agents[agent_id])
         self.agents[agent_id] = AgentResource(
             agent_id=agent_id,
             agent_type=agent_type,
             max_capacity=max_capacity,
             specialization_score=specializations or {}
         )
-        self.metrics['agent_utilization'][agent_id] = 0.0
+        self.agents_by_type[agent_type].append(self.agents[agent_id])
+        self._assign_agent_slot(self.agents[agent_id])
+        self._push_agent(self.agents[agent_id])
         self.logger.info(f"Registered agent {agent_id} ({agent_type.value}) with capacity {max_capacity}")
     
     def unregister_agent(self, agent_id: str):
@@ -191,9 +355,11 @@ class TaskScheduler:
             for task_id in tasks_to_reassign:
                 asyncio.create_task(self._reassign_task(task_id))
             
-            del self.agents[agent_id]
-            if agent_id in self.metrics['agent_utilization']:
-                del self.metrics['agent_utilization'][agent_id]
+            self._remove_from_type_bucket(self.agents.pop(agent_id))
+            self._agent_heap_seq.pop(agent_id, None)  # Leaves its heap entries stale
+            self.agent_runners.pop(agent_id, None)
+            self._free_slots.append(self._agent_slots.pop(agent_id))
+            self._available_agents.discard(agent_id)
             
             self.logger.info(f"Unregistered agent {agent_id}")
     
@@ -207,34 +373,32 @@ class TaskScheduler:
                           metadata: Dict[str, Any] = None) -> bool:
         """Schedule a task for execution"""
         
-        # Convert priority to numeric value
-        priority_map = {
-            TaskPriority.LOW: 1,
-            TaskPriority.MEDIUM: 2,
-            TaskPriority.HIGH: 3,
-            TaskPriority.URGENT: 4
-        }
-        
         scheduled_task = ScheduledTask(
             task_id=task_id,
-            priority=priority_map.get(priority, 2),
-            scheduled_time=datetime.utcnow(),
-            deadline=deadline,
+            priority=_PRIORITY_MAP.get(priority, 2),
+            scheduled_time_ns=self._now_ns(),
+            deadline_ns=_datetime_to_ns(deadline) if deadline else None,
             dependencies=set(dependencies or []),
             agent_requirements=set(agent_requirements or []),
             estimated_duration=estimated_duration,
             metadata=metadata or {}
         )
+        scheduled_task.keyword_ids = self._extract_task_keywords(scheduled_task)
         
         # Check dependencies
-        if dependencies:
-            for dep_id in dependencies:
-                if dep_id not in self.completed_tasks:
-                    self.task_dependencies[task_id].add(dep_id)
-                    self.dependency_graph[dep_id].add(task_id)
-        
-        # Add to queue
-        heapq.heappush(self.task_queue, scheduled_task)
+        for dep_id in scheduled_task.dependencies:
+            if dep_id not in self.completed_tasks:
+                self.task_dependencies[task_id].add(dep_id)
+                self.dependency_graph[dep_id].add(task_id)
+                scheduled_task.pending_deps += 1
+        if scheduled_task.pending_deps:
+            self._invalidate_closures(self.task_dependencies[task_id])
+        
+        # Only tasks with no outstanding dependencies enter the queue
+        if scheduled_task.pending_deps:
+            self.blocked[task_id] = scheduled_task
+        else:
+            self._enqueue(scheduled_task)
         self.metrics['tasks_scheduled'] += 1
         
         self.logger.info(f"Scheduled task {task_id} with priority {priority.value}")
@@ -243,13 +407,20 @@ class TaskScheduler:
     async def cancel_task(self, task_id: str) -> bool:
         """Cancel a scheduled or executing task"""
         # Check if task is in queue
-        for i, task in enumerate(self.task_queue):
-            if task.task_id == task_id:
-                task.state = TaskExecutionState.CANCELLED
-                self.task_queue.pop(i)
-                heapq.heapify(self.task_queue)
-                self.logger.info(f"Cancelled queued task {task_id}")
-                return True
+        task = self.queued_index.pop(task_id, None)
+        if task is not None:
+            task.state = TaskExecutionState.CANCELLED
+            self.task_queue.remove(task)
+            self.logger.info(f"Cancelled queued task {task_id}")
+            self._cancel_dependents(task_id)
+            return True
+        
+        task = self.blocked.pop(task_id, None)
+        if task is not None:
+            task.state = TaskExecutionState.CANCELLED
+            self.logger.info(f"Cancelled blocked task {task_id}")
+            self._cancel_dependents(task_id)
+            return True
         
         # Check if task is executing
         if task_id in self.executing_tasks:
@@ -262,49 +433,56 @@ class TaskScheduler:
                 if agent_id in self.agents:
                     self.agents[agent_id].current_tasks.discard(task_id)
                     self.agents[agent_id].current_load -= 1
+                    self._push_agent(self.agents[agent_id])
                 del self.agent_assignments[task_id]
             
             del self.executing_tasks[task_id]
             self.logger.info(f"Cancelled executing task {task_id}")
+            self._cancel_dependents(task_id)
             return True
         
         return False
     
-    async def _scheduler_loop(self):
-        """Main scheduler loop"""
-        while self.is_running:
-            try:
-                await self._schedule_pending_tasks()
-                await self._check_completed_tasks()
-                await self._handle_failed_tasks()
-                await self._update_metrics()
-                
-                await asyncio.sleep(self.scheduler_interval)
-                
-            except Exception as e:
-                self.logger.error(f"Scheduler loop error: {e}", exc_info=True)
-                await asyncio.sleep(1)  # Brief pause before retrying
+    def _start_tick(self):
+        """Timer callback: run one scheduler tick as a task"""
+        self._tick_handle = None
+        self.scheduler_task = self._loop.create_task(self._scheduler_tick())
+    
+    async def _scheduler_tick(self):
+        """Run one scheduling pass and arm the timer for the next"""
+        delay = self.scheduler_interval
+        try:
+            self._tick_now_ns = self._now_ns()
+            await self._schedule_pending_tasks()
+            self._update_metrics()
+        except Exception as e:
+            self.logger.error(f"Scheduler loop error: {e}", exc_info=True)
+            delay = 1  # Brief pause before retrying
+        
+        if self.is_running:
+            self._tick_handle = self._loop.call_later(delay, self._start_tick)
     
     async def _schedule_pending_tasks(self):
         """Schedule pending tasks based on current mode"""
         if not self.task_queue:
             return
         
+        # Never run more than max_concurrent_tasks at once; the executor is
+        # sized to match, so runner calls start without queueing
+        free_slots = self.max_concurrent_tasks - len(self.executing_tasks)
+        if free_slots <= 0:
+            return
+        
         available_agents = self._get_available_agents()
         if not available_agents:
             return
         
-        # Get ready tasks (no pending dependencies)
-        ready_tasks = []
-        while self.task_queue and len(ready_tasks) < len(available_agents):
-            task = heapq.heappop(self.task_queue)
-            
-            if self._are_dependencies_satisfied(task):
-                ready_tasks.append(task)
-            else:
-                # Put back in queue
-                heapq.heappush(self.task_queue, task)
-                break
+        # Get ready tasks (the queue only holds tasks with no pending dependencies)
+        batch_size = min(len(available_agents), free_slots)
+        ready_tasks = list(self.task_queue.islice(0, batch_size))
+        del self.task_queue[:batch_size]
+        for task in ready_tasks:
+            del self.queued_index[task.task_id]
         
         # Schedule tasks based on mode
         if self.mode == SchedulerMode.SMART:
@@ -320,29 +498,29 @@ class TaskScheduler:
     
     async def _smart_schedule(self, tasks: List[ScheduledTask], agents: List[AgentResource]):
         """AI-powered intelligent scheduling"""
+        remaining = {agent.agent_id for agent in agents}
+        
         for task in tasks:
-            if not agents:
-                break
-            
-            # Calculate agent scores for this task
-            agent_scores = []
-            for agent in agents:
-                score = self._calculate_agent_task_score(agent, task)
-                agent_scores.append((score, agent))
+            # Only agents of a required type are scored
+            if task.agent_requirements:
+                candidates = self._get_available_agents(task.agent_requirements)
+            else:
+                candidates = agents
+            candidates = [agent for agent in candidates if agent.agent_id in remaining]
             
-            # Sort by score (highest first)
-            agent_scores.sort(reverse=True)
+            if not candidates:
+                self._enqueue(task)  # Wait for a matching agent to free up
+                continue
             
-            # Assign to best agent
-            best_agent = agent_scores[0][1]
+            # Assign to best agent (highest score, first on ties)
+            scores = self._score_agents(candidates, task)
+            best_agent = candidates[int(np.argmax(scores))]
             await self._assign_task_to_agent(task, best_agent)
-            agents.remove(best_agent)
+            remaining.discard(best_agent.agent_id)
     
     async def _load_balanced_schedule(self, tasks: List[ScheduledTask], agents: List[AgentResource]):
         """Load-balanced scheduling"""
-        # Sort agents by current load (lowest first)
-        agents.sort(key=lambda a: a.utilization_rate)
-        
+        # Agents already arrive ordered by current load (lowest first)
         for task, agent in zip(tasks, agents):
             await self._assign_task_to_agent(task, agent)
     
@@ -354,79 +532,49 @@ class TaskScheduler:
     
     async def _deadline_schedule(self, tasks: List[ScheduledTask], agents: List[AgentResource]):
         """Deadline-aware scheduling"""
-        # Sort tasks by deadline (earliest first)
-        tasks_with_deadlines = [t for t in tasks if t.deadline]
-        tasks_without_deadlines = [t for t in tasks if not t.deadline]
-        
-        tasks_with_deadlines.sort(key=lambda t: t.deadline)
-        all_tasks = tasks_with_deadlines + tasks_without_deadlines
-        
-        for task, agent in zip(all_tasks, agents):
+        # In deadline mode the queue is keyed earliest deadline first
+        for task, agent in zip(tasks, agents):
             await self._assign_task_to_agent(task, agent)
     
     async def _fifo_schedule(self, tasks: List[ScheduledTask], agents: List[AgentResource]):
         """First In, First Out scheduling"""
         # Sort by scheduled time
-        tasks.sort(key=lambda t: t.scheduled_time)
+        tasks.sort(key=attrgetter('scheduled_time_ns'))
         
         for task, agent in zip(tasks, agents):
             await self._assign_task_to_agent(task, agent)
     
-    def _calculate_agent_task_score(self, agent: AgentResource, task: ScheduledTask) -> float:
-        """Calculate how well an agent matches a task"""
-        score = 0.0
-        
-        # Agent type match
-        if task.agent_requirements:
-            if agent.agent_type in task.agent_requirements:
-                score += 10.0
-            else:
-                return 0.0  # Agent can't handle this task
-        else:
-            score += 5.0  # Default match
-        
-        # Performance score
-        score += agent.performance_score * 3.0
+    def _score_agents(self, agents: List[AgentResource], task: ScheduledTask) -> np.ndarray:
+        """Score how well each agent matches a task (agents already meet its type requirements)"""
+        slots = np.fromiter(
+            (self._agent_slots[agent.agent_id] for agent in agents), dtype=np.intp, count=len(agents)
+        )
         
-        # Load factor (prefer less loaded agents)
-        load_penalty = agent.utilization_rate * 2.0
-        score -= load_penalty
+        # Agent type match, performance, and load factor (prefer less loaded agents)
+        scores = self._agent_perf[slots] * 3.0 - self._agent_util[slots] * 2.0
+        scores += 10.0 if task.agent_requirements else 5.0
         
         # Specialization match
-        task_keywords = self._extract_task_keywords(task)
-        for keyword in task_keywords:
-            if keyword in agent.specialization_score:
-                score += agent.specialization_score[keyword] * 2.0
+        # Ids past the matrix width belong to keywords no agent specializes in
+        keyword_ids = task.keyword_ids[task.keyword_ids < self._agent_spec.shape[1]]
+        if len(keyword_ids):
+            scores += self._agent_spec[np.ix_(slots, keyword_ids)].sum(axis=1) * 2.0
         
         # Deadline urgency
-        if task.deadline:
-            time_to_deadline = (task.deadline - datetime.utcnow()).total_seconds() / 3600  # hours
+        if task.deadline_ns is not None:
+            time_to_deadline = (task.deadline_ns - self._tick_now_ns) / NS_PER_HOUR  # hours
             if time_to_deadline < 2:  # Less than 2 hours
-                score += 5.0
+                scores += 5.0
             elif time_to_deadline < 24:  # Less than 24 hours
-                score += 2.0
-        
-        return max(0.0, score)
-    
-    def _extract_task_keywords(self, task: ScheduledTask) -> List[str]:
-        """Extract keywords from task metadata for specialization matching"""
-        keywords = []
-        
-        if 'description' in task.metadata:
-            description = task.metadata['description'].lower()
-            # Simple keyword extraction
-            if 'react' in description or 'frontend' in description:
-                keywords.append('frontend')
-            if 'api' in description or 'backend' in description:
-                keywords.append('backend')
-            if 'design' in description or 'ui' in description or 'ux' in description:
-                keywords.append('design')
-            if 'test' in description or 'qa' in description:
-                keywords.append('testing')
-            if 'product' in description or 'requirement' in description:
-                keywords.append('product')
-        
-        return keywords
+                scores += 2.0
+        
+        return np.maximum(scores, 0.0)
+    
+    def _extract_task_keywords(self, task: ScheduledTask) -> np.ndarray:
+        """Extract keyword ids from task metadata for specialization matching"""
+        if 'description' not in task.metadata:
+            return _NO_KEYWORDS
+        return _match_task_keywords(task.metadata['description'].lower())
     
     async def _assign_task_to_agent(self, task: ScheduledTask, agent: AgentResource):
         """Assign a task to an agent and start execution"""
@@ -435,6 +583,7 @@ class TaskScheduler:
         # Update agent state
         agent.current_tasks.add(task.task_id)
         agent.current_load += 1
+        self._push_agent(agent)
         
         # Record assignment
         self.agent_assignments[task.task_id] = agent.agent_id
@@ -443,35 +592,36 @@ class TaskScheduler:
         self.logger.info(f"Assigned task {task.task_id} to agent {agent.agent_id}")
         
         # Start task execution
-        asyncio.create_task(self._execute_task(task, agent))
+        self._loop.create_task(self._execute_task(task, agent))
         
         # Call callbacks
-        for callback in self.task_started_callbacks:
-            try:
-                await callback(task.task_id, agent.agent_id)
-            except Exception as e:
-                self.logger.error(f"Task started callback error: {e}")
+        await self._fire('started', self.task_started_callbacks, task.task_id, agent.agent_id)
     
     async def _execute_task(self, task: ScheduledTask, agent: AgentResource):
         """Execute a task with the assigned agent"""
-        start_time = time.time()
+        start_time = time.monotonic()
         
         try:
-            # This would be replaced with actual agent execution
-            # For now, simulate task execution
-            execution_time = task.estimated_duration or 5  # minutes
-            await asyncio.sleep(execution_time * 60)  # Convert to seconds for simulation
+            runner = self.agent_runners.get(agent.agent_id)
+            if runner is None:
+                # No runner registered; simulate the estimated duration
+                execution_time = task.estimated_duration or 5  # minutes
+                await asyncio.sleep(execution_time * 60)
+            elif asyncio.iscoroutinefunction(runner):
+                task.result = await runner(task.metadata)
+            else:
+                task.result = await self._loop.run_in_executor(self.executor, runner, task.metadata)
             
             # Mark as completed
             task.state = TaskExecutionState.COMPLETED
-            execution_duration = time.time() - start_time
+            execution_duration = time.monotonic() - start_time
             
             # Update agent state
-            agent.current_tasks.discard(task.task_id)
-            agent.current_load -= 1
             agent.last_task_completion = datetime.utcnow()
+            self._release_agent(task, agent)
             
             # Move to completed
+            self._dequeue(task.task_id)
             self.completed_tasks[task.task_id] = task
             if task.task_id in self.executing_tasks:
                 del self.executing_tasks[task.task_id]
@@ -485,11 +635,8 @@ class TaskScheduler:
             self.logger.info(f"Task {task.task_id} completed in {execution_duration:.2f}s")
             
             # Call callbacks
-            for callback in self.task_completed_callbacks:
-                try:
-                    await callback(task.task_id, agent.agent_id, execution_duration)
-                except Exception as e:
-                    self.logger.error(f"Task completed callback error: {e}")
+            await self._fire('completed', self.task_completed_callbacks,
+                             task.task_id, agent.agent_id, execution_duration)
         
         except Exception as e:
             # Handle task failure
@@ -497,28 +644,42 @@ class TaskScheduler:
             task.retry_count += 1
             
             # Update agent state
-            agent.current_tasks.discard(task.task_id)
-            agent.current_load -= 1
+            self._release_agent(task, agent)
             
             # Move to failed or retry
+            self._dequeue(task.task_id)
             if task.retry_count < task.max_retries:
                 task.state = TaskExecutionState.RETRYING
-                heapq.heappush(self.task_queue, task)
+                self._enqueue(task)
                 self.logger.warning(f"Task {task.task_id} failed, retrying ({task.retry_count}/{task.max_retries})")
             else:
                 self.failed_tasks[task.task_id] = task
                 self.metrics['tasks_failed'] += 1
                 self.logger.error(f"Task {task.task_id} failed permanently: {e}")
+                self._cancel_dependents(task.task_id)
             
             if task.task_id in self.executing_tasks:
                 del self.executing_tasks[task.task_id]
             
             # Call callbacks
-            for callback in self.task_failed_callbacks:
-                try:
-                    await callback(task.task_id, agent.agent_id, str(e))
-                except Exception as e:
-                    self.logger.error(f"Task failed callback error: {e}")
+            await self._fire('failed', self.task_failed_callbacks,
+                             task.task_id, agent.agent_id, str(e))
+    
+    async def _fire(self, kind: str, callbacks: List[Callable], *args):
+        """Run an event's callbacks concurrently, logging any that raise"""
+        if not callbacks:
+            return
+        
+        limit = self._callback_limits[kind]
+        
+        async def run(callback: Callable):
+            async with limit:
+                await callback(*args)
+        
+        results = await asyncio.gather(*(run(callback) for callback in callbacks), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                self.logger.error(f"Task {kind} callback error: {result}")
     
     async def _process_dependent_tasks(self, completed_task_id: str):
         """Process tasks that were waiting for this task to complete"""
@@ -528,48 +689,193 @@ class TaskScheduler:
             for dependent_task_id in dependent_tasks:
                 if dependent_task_id in self.task_dependencies:
                     self.task_dependencies[dependent_task_id].discard(completed_task_id)
+                
+                # Release the dependent once its last dependency completes
+                dependent = self.blocked.get(dependent_task_id)
+                if dependent is not None:
+                    dependent.pending_deps -= 1
+                    if dependent.pending_deps == 0:
+                        del self.blocked[dependent_task_id]
+                        self._enqueue(dependent)
             
             del self.dependency_graph[completed_task_id]
-    
-    def _are_dependencies_satisfied(self, task: ScheduledTask) -> bool:
-        """Check if all task dependencies are satisfied"""
-        if not task.dependencies:
-            return True
+            self._closure_cache.pop(completed_task_id, None)
+    
+    def get_dependent_tasks(self, task_id: str) -> FrozenSet[str]:
+        """Tasks that transitively wait on ``task_id``; memoized until the graph grows"""
+        closure = self._closure_cache.get(task_id)
+        if closure is not None:
+            return closure
+        
+        dependents: Set[str] = set()
+        stack = [task_id]
+        while stack:
+            for child_id in self.dependency_graph.get(stack.pop(), ()):
+                if child_id in dependents:
+                    continue
+                dependents.add(child_id)
+                cached = self._closure_cache.get(child_id)
+                if cached is not None:
+                    dependents |= cached
+                else:
+                    stack.append(child_id)
+        
+        closure = self._closure_cache[task_id] = frozenset(dependents)
+        return closure
+    
+    def _invalidate_closures(self, task_ids: Set[str]):
+        """Drop cached closures of tasks that gained a dependent, and their ancestors"""
+        seen = set()
+        stack = list(task_ids)
+        while stack:
+            task_id = stack.pop()
+            if task_id in seen:
+                continue
+            seen.add(task_id)
+            self._closure_cache.pop(task_id, None)
+            stack.extend(self.task_dependencies.get(task_id, ()))
+    
+    def _cancel_dependents(self, task_id: str):
+        """Cancel blocked tasks that can no longer run because ``task_id`` won't complete"""
+        cancelled = 0
+        for dependent_id in self.get_dependent_tasks(task_id):
+            dependent = self.blocked.pop(dependent_id, None)
+            if dependent is not None:
+                dependent.state = TaskExecutionState.CANCELLED
+                cancelled += 1
+        
+        if cancelled:
+            self.logger.info(f"Cancelled {cancelled} tasks depending on {task_id}")
+    
+    def _queue_key(self, task: ScheduledTask) -> int:
+        """Queue ordering key for a task under the current mode"""
+        if self.mode == SchedulerMode.DEADLINE and task.deadline_ns is not None:
+            return _deadline_sort_key(task.deadline_ns)
+        return _task_sort_key(task.priority, task.scheduled_time_ns)
+    
+    def _now_ns(self) -> int:
+        """Current epoch nanoseconds from the monotonic clock"""
+        return time.monotonic_ns() + self._epoch_offset_ns
+    
+    def _enqueue(self, task: ScheduledTask):
+        """Add a task to the ordered queue and index it for O(1) lookup"""
+        task.sort_key = self._queue_key(task)
+        self.task_queue.add(task)
+        self.queued_index[task.task_id] = task
+    
+    def _dequeue(self, task_id: str):
+        """Drop a task from the queue, e.g. one requeued by unregister_agent that then finished"""
+        task = self.queued_index.pop(task_id, None)
+        if task is not None:
+            self.task_queue.remove(task)
+    
+    def _release_agent(self, task: ScheduledTask, agent: AgentResource):
+        """Free the agent capacity held by a finished task"""
+        agent.current_tasks.discard(task.task_id)
+        agent.current_load -= 1
+        # The agent may have been unregistered (or replaced) while the task ran
+        if self.agents.get(agent.agent_id) is agent:
+            self._push_agent(agent)
+    
+    def _push_agent(self, agent: AgentResource):
+        """Record an agent's current utilization after a load change"""
+        slot = self._agent_slots[agent.agent_id]
+        self._agent_util[slot] = agent.utilization_rate
+        self._agent_perf[slot] = agent.performance_score
+        if agent.is_available:
+            self._available_agents.add(agent.agent_id)
+        else:
+            self._available_agents.discard(agent.agent_id)
         
-        for dep_id in task.dependencies:
-            if dep_id not in self.completed_tasks:
-                return False
+        seq = next(self._agent_heap_counter)
+        self._agent_heap_seq[agent.agent_id] = seq
+        heapq.heappush(self.agent_heap, (agent.utilization_rate, seq, agent.agent_id))
         
-        return True
-    
-    def _get_available_agents(self) -> List[AgentResource]:
-        """Get list of available agents"""
-        return [agent for agent in self.agents.values() if agent.is_available]
-    
-    async def _check_completed_tasks(self):
-        """Check for completed tasks and clean up"""
-        # This is handled in _execute_task, but could be used for additional cleanup
-        pass
-    
-    async def _handle_failed_tasks(self):
-        """Handle failed tasks and retry logic"""
-        # This is handled in _execute_task, but could be used for additional failure handling
-        pass
-    
-    async def _update_metrics(self):
-        """Update scheduler metrics"""
-        # Update agent utilization
-        for agent_id, agent in self.agents.items():
-            self.metrics['agent_utilization'][agent_id] = agent.utilization_rate
+        # Rebuild once stale entries clearly outnumber live ones
+        if len(self.agent_heap) > 4 * len(self.agents) + 16:
+            self.agent_heap = [
+                entry for entry in self.agent_heap
+                if self._agent_heap_seq.get(entry[2]) == entry[1]
+            ]
+            heapq.heapify(self.agent_heap)
+    
+    def _assign_agent_slot(self, agent: AgentResource):
+        """Give an agent a row in the scoring columns and load its specializations"""
+        slot = self._agent_slots.get(agent.agent_id)
+        if slot is None:
+            slot = self._free_slots.pop() if self._free_slots else len(self._agent_slots)
+            self._agent_slots[agent.agent_id] = slot
+        
+        if slot >= len(self._agent_perf):
+            capacity = 2 * len(self._agent_perf)
+            self._agent_perf = np.resize(self._agent_perf, capacity)
+            self._agent_util = np.resize(self._agent_util, capacity)
+            self._agent_spec = np.vstack([self._agent_spec, np.zeros_like(self._agent_spec)])
+        
+        keyword_ids = [_keyword_id(keyword) for keyword in agent.specialization_score]
+        if len(_KEYWORD_IDS) > self._agent_spec.shape[1]:
+            grow = len(_KEYWORD_IDS) - self._agent_spec.shape[1]
+            self._agent_spec = np.pad(self._agent_spec, ((0, 0), (0, grow)))
+        
+        self._agent_spec[slot] = 0.0
+        self._agent_spec[slot, keyword_ids] = list(agent.specialization_score.values())
+    
+    def _remove_from_type_bucket(self, agent: AgentResource):
+        """Drop an agent from its type bucket"""
+        bucket = self.agents_by_type[agent.agent_type]
+        bucket.remove(agent)
+        if not bucket:
+            del self.agents_by_type[agent.agent_type]
+    
+    def _get_available_agents(self, required_types: Optional[Set[AgentType]] = None) -> List[AgentResource]:
+        """Get list of available agents, least utilized first
+        
+        With ``required_types`` only those type buckets are scanned and the
+        result is unordered.
+        """
+        if required_types:
+            return [
+                agent
+                for agent_type in required_types
+                for agent in self.agents_by_type.get(agent_type, ())
+                if agent.is_available
+            ]
         
+        heap = self.agent_heap
+        live, available = [], []
+        
+        # Agents with spare capacity sort below full ones (utilization < 1.0)
+        while heap and heap[0][0] < 1.0:
+            entry = heapq.heappop(heap)
+            if self._agent_heap_seq.get(entry[2]) != entry[1]:
+                continue  # Stale entry
+            live.append(entry)
+            agent = self.agents[entry[2]]
+            if agent.is_available:
+                available.append(agent)
+        
+        # Selection does not consume agents; put the live entries back
+        for entry in live:
+            heapq.heappush(heap, entry)
+        return available
+    
+    def _refresh_utilization(self):
+        """Publish agent utilization from the per-slot column into the metrics"""
+        slots = list(self._agent_slots.values())
+        self.metrics['agent_utilization'] = dict(
+            zip(self._agent_slots, self._agent_util[slots].tolist())
+        )
+    
+    def _update_metrics(self):
+        """Update per-tick scheduler metrics"""
         # Calculate throughput (tasks per minute)
-        if hasattr(self, '_last_metrics_update'):
-            time_diff = time.time() - self._last_metrics_update
+        if hasattr(self, '_last_metrics_update_ns'):
+            time_diff = (self._tick_now_ns - self._last_metrics_update_ns) / 1e9
             if time_diff > 0:
                 completed_diff = self.metrics['tasks_completed'] - getattr(self, '_last_completed_count', 0)
                 self.metrics['throughput'] = (completed_diff / time_diff) * 60  # per minute
         
-        self._last_metrics_update = time.time()
+        self._last_metrics_update_ns = self._tick_now_ns
         self._last_completed_count = self.metrics['tasks_completed']
     
     async def _reassign_task(self, task_id: str):
@@ -583,12 +889,13 @@ class TaskScheduler:
                 if agent_id in self.agents:
                     self.agents[agent_id].current_tasks.discard(task_id)
                     self.agents[agent_id].current_load -= 1
+                    self._push_agent(self.agents[agent_id])
                 del self.agent_assignments[task_id]
             
             # Put back in queue
             task.state = TaskExecutionState.QUEUED
             del self.executing_tasks[task_id]
-            heapq.heappush(self.task_queue, task)
+            self._enqueue(task)
             
             self.logger.info(f"Reassigned task {task_id}")
     
@@ -608,15 +915,16 @@ class TaskScheduler:
     # Status and monitoring methods
     def get_status(self) -> Dict[str, Any]:
         """Get current scheduler status"""
+        self._refresh_utilization()
         return {
             'mode': self.mode.value,
             'is_running': self.is_running,
-            'queue_size': len(self.task_queue),
+            'queue_size': len(self.queued_index) + len(self.blocked),
             'executing_tasks': len(self.executing_tasks),
             'completed_tasks': len(self.completed_tasks),
             'failed_tasks': len(self.failed_tasks),
             'registered_agents': len(self.agents),
-            'available_agents': len(self._get_available_agents()),
+            'available_agents': len(self._available_agents),
             'metrics': self.metrics
         }
     
@@ -648,28 +956,28 @@ class TaskScheduler:
                     'task_id': task.task_id,
                     'state': task.state.value,
                     'priority': task.priority,
-                    'scheduled_time': task.scheduled_time.isoformat(),
-                    'deadline': task.deadline.isoformat() if task.deadline else None,
+                    'scheduled_time': _ns_to_datetime(task.scheduled_time_ns).isoformat(),
+                    'deadline': _ns_to_datetime(task.deadline_ns).isoformat() if task.deadline_ns is not None else None,
                     'retry_count': task.retry_count,
                     'assigned_agent': self.agent_assignments.get(task_id),
                     'dependencies': list(task.dependencies),
                     'metadata': task.metadata
                 }
         
-        # Check queue
-        for task in self.task_queue:
-            if task.task_id == task_id:
-                return {
-                    'task_id': task.task_id,
-                    'state': task.state.value,
-                    'priority': task.priority,
-                    'scheduled_time': task.scheduled_time.isoformat(),
-                    'deadline': task.deadline.isoformat() if task.deadline else None,
-                    'retry_count': task.retry_count,
-                    'assigned_agent': None,
-                    'dependencies': list(task.dependencies),
-                    'metadata': task.metadata
-                }
+        # Check queue, including tasks still waiting on dependencies
+        task = self.queued_index.get(task_id) or self.blocked.get(task_id)
+        if task is not None:
+            return {
+                'task_id': task.task_id,
+                'state': task.state.value,
+                'priority': task.priority,
+                'scheduled_time': _ns_to_datetime(task.scheduled_time_ns).isoformat(),
+                'deadline': _ns_to_datetime(task.deadline_ns).isoformat() if task.deadline_ns is not None else None,
+                'retry_count': task.retry_count,
+                'assigned_agent': None,
+                'dependencies': list(task.dependencies),
+                'metadata': task.metadata
+            }
         
         return None
     
@@ -677,6 +985,13 @@ class TaskScheduler:
         """Change scheduler mode"""
         old_mode = self.mode
         self.mode = mode
+        
+        # Deadline mode orders the queue differently; re-key it once
+        if SchedulerMode.DEADLINE in (old_mode, mode) and old_mode != mode:
+            tasks = list(self.task_queue)
+            for task in tasks:
+                task.sort_key = self._queue_key(task)
+            self.task_queue = SortedKeyList(tasks, key=attrgetter('sort_key'))
         self.logger.info(f"Scheduler mode changed from {old_mode.value} to {mode.value}")
     
     async def adjust_agent_capacity(self, agent_id: str, new_capacity: int):
@@ -684,16 +999,18 @@ class TaskScheduler:
         if agent_id in self.agents:
             old_capacity = self.agents[agent_id].max_capacity
             self.agents[agent_id].max_capacity = new_capacity
+            self._push_agent(self.agents[agent_id])
             self.logger.info(f"Agent {agent_id} capacity changed from {old_capacity} to {new_capacity}")
     
     def get_metrics(self) -> Dict[str, Any]:
         """Get detailed scheduler metrics"""
+        self._refresh_utilization()
         return {
             **self.metrics,
-            'queue_depth': len(self.task_queue),
+            'queue_depth': len(self.queued_index) + len(self.blocked),
             'active_tasks': len(self.executing_tasks),
             'total_agents': len(self.agents),
-            'available_agents': len(self._get_available_agents()),
+            'available_agents': len(self._available_agents),
             'scheduler_mode': self.mode.value,
             'uptime': time.time() - getattr(self, '_start_time', time.time())
         }
@@ -1,18 +1,58 @@
 # VirtuAI Office - Advanced Workflow Orchestration System
 import asyncio
+import heapq
+import itertools
 import json
-import uuid
+import secrets
+import sys
+import time
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Callable, Set
+from typing import List, Dict, Any, Optional, Callable, Set, Tuple, Deque
 from dataclasses import dataclass, field
-from enum import Enum
+from enum import Enum, IntEnum
 import logging
+import operator
 from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+
+import numpy as np
+from croniter import croniter
+from sortedcontainers import SortedKeyList
 
 from ..core.logging import get_logger, log_error_with_context
 from ..models.database import Task, Agent, TaskStatus, TaskPriority
 
 
+if hasattr(asyncio, 'eager_task_factory'):  # Python 3.12+
+    def _create_task(coro) -> asyncio.Task:
+        """Start a task eagerly: it runs inline until its first real suspension"""
+        return asyncio.eager_task_factory(asyncio.get_running_loop(), coro)
+else:
+    _create_task = asyncio.create_task
+
+if hasattr(asyncio, 'TaskGroup'):  # Python 3.11+
+    async def _run_all(coros) -> None:
+        """Run coroutines concurrently; the first failure cancels the rest"""
+        async with asyncio.TaskGroup() as tg:
+            for coro in coros:
+                tg.create_task(coro)
+else:
+    async def _run_all(coros) -> None:
+        """Run coroutines concurrently; the first failure cancels the rest"""
+        tasks = [_create_task(coro) for coro in coros]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+
+# dataclass only takes slots=True from Python 3.10
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
 class WorkflowStatus(str, Enum):
     PENDING = "pending"
     RUNNING = "running"
@@ -22,6 +62,17 @@ class WorkflowStatus(str, Enum):
     CANCELLED = "cancelled"
 
 
+_WORKFLOW_STATUSES = list(WorkflowStatus)
+_WORKFLOW_STATUS_CODES = {status: code for code, status in enumerate(_WORKFLOW_STATUSES)}
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _newest_first(execution: 'WorkflowExecution') -> float:
+    """Sort key listing executions by start time, newest first"""
+    return -((execution.started_at or datetime.min) - _EPOCH).total_seconds()
+
+
 class StepStatus(str, Enum):
     WAITING = "waiting"
     READY = "ready"
@@ -31,6 +82,11 @@ class StepStatus(str, Enum):
     SKIPPED = "skipped"
 
 
+class StepKind(IntEnum):
+    NORMAL = 0
+    CONDITIONAL = 1
+
+
 class WorkflowTrigger(str, Enum):
     MANUAL = "manual"
     SCHEDULED = "scheduled"
@@ -38,7 +94,7 @@ class WorkflowTrigger(str, Enum):
     DEPENDENCY_COMPLETE = "dependency_complete"
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class WorkflowStep:
     id: str
     name: str
@@ -53,9 +109,13 @@ class WorkflowStep:
     output: Optional[str] = None
     error: Optional[str] = None
     metadata: Dict[str, Any] = field(default_factory=dict)
+    
+    # time.monotonic() readings for durations; started_at/completed_at are for display
+    started_monotonic: Optional[float] = field(default=None, init=False, repr=False, compare=False)
+    completed_monotonic: Optional[float] = field(default=None, init=False, repr=False, compare=False)
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class WorkflowDefinition:
     id: str
     name: str
@@ -69,7 +129,7 @@ class WorkflowDefinition:
     variables: Dict[str, Any] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class WorkflowExecution:
     id: str
     workflow_id: str
@@ -80,6 +140,58 @@ class WorkflowExecution:
     error: Optional[str] = None
     context: Dict[str, Any] = field(default_factory=dict)
     step_results: Dict[str, Any] = field(default_factory=dict)
+    running_steps: Set[str] = field(default_factory=set)
+    completed_steps: Set[str] = field(default_factory=set)
+    failed_steps: Set[str] = field(default_factory=set)
+    agent_affinity: Dict[str, str] = field(default_factory=dict)  # agent_type -> agent id last used
+    settled_steps: asyncio.Queue = field(default_factory=asyncio.Queue, repr=False)  # IDs of finished steps
+    
+    # time.monotonic() readings for durations; started_at/completed_at are for display
+    started_monotonic: Optional[float] = field(default=None, init=False, repr=False, compare=False)
+    completed_monotonic: Optional[float] = field(default=None, init=False, repr=False, compare=False)
+    
+    # Rendered "- key: value" blocks for step descriptions; None means rebuild.
+    # Write context/step_results through set_context/set_step_result to keep them current.
+    context_text: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    results_text: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    
+    def set_context(self, key: str, value: Any):
+        """Set a context variable, keeping the rendered context block current"""
+        if key not in self.context and self.context_text is not None:
+            self.context_text += f"\n- {key}: {value}" if self.context_text else f"- {key}: {value}"
+        else:
+            self.context_text = None
+        self.context[key] = value
+    
+    def set_step_result(self, step_id: str, result: Any):
+        """Record a step result, keeping the rendered results block current"""
+        if step_id not in self.step_results and self.results_text is not None:
+            self.results_text += f"\n- {step_id}: {result}" if self.results_text else f"- {step_id}: {result}"
+        else:
+            self.results_text = None
+        self.step_results[step_id] = result
+    
+    def render_context(self) -> str:
+        """Context variables as "- key: value" lines, cached until changed"""
+        if self.context_text is None:
+            self.context_text = "\n".join([f"- {k}: {v}" for k, v in self.context.items()])
+        return self.context_text
+    
+    def render_results(self) -> str:
+        """Step results as "- step_id: result" lines, cached until changed"""
+        if self.results_text is None:
+            self.results_text = "\n".join([f"- {k}: {v}" for k, v in self.step_results.items()])
+        return self.results_text
+
+
+@dataclass(**_DATACLASS_SLOTS)
+class _ExecutionPlan:
+    """Scheduling data for one workflow shape, built once at registration"""
+    steps_by_id: Dict[str, WorkflowStep]
+    kinds: Dict[str, StepKind]
+    in_degree: Dict[str, int]  # Copied per execution
+    roots: List[tuple]  # Ready-heap entries of steps with no dependencies, heapified
+    releases: Dict[str, List[Tuple[str, tuple]]]  # step_id -> (dependent_id, ready-heap entry)
 
 
 class WorkflowCondition(ABC):
@@ -90,6 +202,18 @@ class WorkflowCondition(ABC):
         pass
 
 
+_CONDITION_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+    "in": lambda ctx_value, value: ctx_value in value,
+    "contains": lambda ctx_value, value: value in str(ctx_value),
+}
+
+
 class SimpleCondition(WorkflowCondition):
     """Simple condition based on context values"""
     
@@ -99,31 +223,17 @@ class SimpleCondition(WorkflowCondition):
         self.value = value
     
     async def evaluate(self, context: Dict[str, Any]) -> bool:
-        ctx_value = context.get(self.key)
-        
-        if self.operator == "==":
-            return ctx_value == self.value
-        elif self.operator == "!=":
-            return ctx_value != self.value
-        elif self.operator == ">":
-            return ctx_value > self.value
-        elif self.operator == "<":
-            return ctx_value < self.value
-        elif self.operator == ">=":
-            return ctx_value >= self.value
-        elif self.operator == "<=":
-            return ctx_value <= self.value
-        elif self.operator == "in":
-            return ctx_value in self.value
-        elif self.operator == "contains":
-            return self.value in str(ctx_value)
-        else:
+        compare = _CONDITION_OPERATORS.get(self.operator)
+        if compare is None:
             return False
+        return compare(context.get(self.key), self.value)
 
 
 class ConditionalStep(WorkflowStep):
     """Workflow step that only executes if condition is met"""
     
+    __slots__ = ('condition',)
+    
     def __init__(self, condition: WorkflowCondition, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.condition = condition
@@ -140,32 +250,72 @@ class ParallelStepGroup:
 class WorkflowEngine:
     """Advanced workflow orchestration engine"""
     
-    def __init__(self, agent_manager, task_processor):
+    def __init__(self, agent_manager, task_processor,
+                 max_concurrent_per_agent_type: int = 8):
         self.agent_manager = agent_manager
         self.task_processor = task_processor
         self.logger = get_logger('virtuai.workflow')
         
+        # Bound on steps dispatched at once per agent type, across all executions
+        self.max_concurrent_per_agent_type = max_concurrent_per_agent_type
+        self.agent_type_limits: Dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.max_concurrent_per_agent_type)
+        )
+        
         # Workflow storage
         self.workflows: Dict[str, WorkflowDefinition] = {}
+        self.execution_plans: Dict[str, _ExecutionPlan] = {}
         self.executions: Dict[str, WorkflowExecution] = {}
+        
+        # Execution ids: random per-engine prefix plus a counter, unique without a uuid per run
+        self._execution_id_prefix = secrets.token_hex(8)
+        self._execution_ids = itertools.count(1)
+        
+        # Executions newest first, overall and per workflow
+        self.executions_by_time: SortedKeyList = SortedKeyList(key=_newest_first)
+        self.executions_by_workflow: Dict[str, SortedKeyList] = {}
         self.running_executions: Set[str] = set()
         
+        # Metrics columns, one row per execution, synced by _record_execution;
+        # start/end hold time.monotonic() readings
+        self._execution_slots: Dict[str, int] = {}
+        self._execution_status = np.zeros(64, dtype=np.int8)
+        self._execution_start = np.full(64, np.nan)
+        self._execution_end = np.full(64, np.nan)
+        
         # Event handlers
-        self.event_handlers: Dict[str, List[Callable]] = {}
+        self.event_handlers: Dict[str, Deque[Callable]] = defaultdict(deque)
         
-        # Scheduled workflows
+        # Scheduled workflows: (next_run, workflow_id) heap; an entry is live
+        # only while it matches the workflow's time in next_runs
         self.scheduler_running = False
         self.scheduler_task = None
+        self.schedule_heap: List[Tuple[datetime, str]] = []
+        self.next_runs: Dict[str, datetime] = {}
+        self.scheduler_wakeup = asyncio.Event()  # Set when the schedule changes
     
     def register_workflow(self, workflow: WorkflowDefinition):
-        """Register a workflow definition"""
+        """Register a workflow definition (re-register after changing its steps)"""
         self.workflows[workflow.id] = workflow
+        self.execution_plans[workflow.id] = self._plan_workflow(workflow)
+        self.next_runs.pop(workflow.id, None)
+        
+        if workflow.trigger == WorkflowTrigger.SCHEDULED and workflow.schedule:
+            try:
+                self._schedule_next_run(workflow, datetime.utcnow())
+                self.scheduler_wakeup.set()
+            except ValueError as e:
+                self.logger.error(f"Invalid schedule for workflow {workflow.id}: {e}")
+        
         self.logger.info(f"Registered workflow: {workflow.name} ({workflow.id})")
     
     def unregister_workflow(self, workflow_id: str):
         """Unregister a workflow definition"""
         if workflow_id in self.workflows:
             del self.workflows[workflow_id]
+            self.execution_plans.pop(workflow_id, None)
+            if self.next_runs.pop(workflow_id, None):  # Leaves its heap entry stale
+                self.scheduler_wakeup.set()
             self.logger.info(f"Unregistered workflow: {workflow_id}")
     
     async def execute_workflow(self, workflow_id: str,
@@ -176,7 +326,7 @@ class WorkflowEngine:
             raise ValueError(f"Workflow {workflow_id} not found")
         
         workflow = self.workflows[workflow_id]
-        execution_id = str(uuid.uuid4())
+        execution_id = f"{self._execution_id_prefix}-{next(self._execution_ids)}"
         
         execution = WorkflowExecution(
             id=execution_id,
@@ -184,14 +334,20 @@ class WorkflowEngine:
             started_at=datetime.utcnow(),
             context=trigger_context or {}
         )
+        execution.started_monotonic = time.monotonic()
         
         self.executions[execution_id] = execution
+        self.executions_by_time.add(execution)
+        self.executions_by_workflow.setdefault(
+            workflow_id, SortedKeyList(key=_newest_first)
+        ).add(execution)
         self.running_executions.add(execution_id)
+        self._record_execution(execution)
         
         self.logger.info(f"Starting workflow execution: {workflow.name} ({execution_id})")
         
         # Start execution in background
-        asyncio.create_task(self._execute_workflow_steps(execution, workflow))
+        _create_task(self._execute_workflow_steps(execution, workflow))
         
         return execution_id
     
@@ -201,93 +357,77 @@ class WorkflowEngine:
         
         try:
             execution.status = WorkflowStatus.RUNNING
+            self._record_execution(execution)
             
-            # Create execution graph
-            step_graph = self._build_dependency_graph(workflow.steps)
-            completed_steps = set()
-            failed_steps = set()
+            # Per-run state is a copy of the registered plan's dependency counts and roots
+            plan = self.execution_plans.get(workflow.id) or self._plan_workflow(workflow)
+            steps_by_id = plan.steps_by_id
+            kinds = plan.kinds
+            in_degree = dict(plan.in_degree)
+            ready = list(plan.roots)
+            releases = plan.releases
             
-            while len(completed_steps) + len(failed_steps) < len(workflow.steps):
-                # Find ready steps
-                ready_steps = []
-                
-                for step in workflow.steps:
-                    if step.id in completed_steps or step.id in failed_steps:
-                        continue
-                    
-                    if step.status in [StepStatus.RUNNING]:
-                        continue
-                    
-                    # Check dependencies
-                    dependencies_met = all(
-                        dep_id in completed_steps for dep_id in step.depends_on
-                    )
-                    
-                    if dependencies_met:
-                        # Check conditional steps
-                        if isinstance(step, ConditionalStep):
-                            if not await step.condition.evaluate(execution.context):
-                                step.status = StepStatus.SKIPPED
-                                completed_steps.add(step.id)
-                                continue
-                        
-                        ready_steps.append(step)
-                
-                if not ready_steps:
-                    # Check if we're waiting for running steps
-                    running_steps = [s for s in workflow.steps
-                                   if s.status == StepStatus.RUNNING]
+            def release(step_id: str):
+                for dependent_id, entry in releases[step_id]:
+                    in_degree[dependent_id] -= 1
+                    if in_degree[dependent_id] == 0:
+                        heapq.heappush(ready, entry)
+            
+            while True:
+                # Launch every step whose dependencies have all completed
+                while ready:
+                    step = steps_by_id[heapq.heappop(ready)[-1]]
                     
-                    if not running_steps:
-                        # Deadlock or completion
-                        break
+                    # Check conditional steps
+                    if kinds[step.id] == StepKind.CONDITIONAL:
+                        if not await step.condition.evaluate(execution.context):
+                            step.status = StepStatus.SKIPPED
+                            execution.completed_steps.add(step.id)
+                            release(step.id)
+                            continue
                     
-                    # Wait for running steps
-                    await asyncio.sleep(1)
-                    continue
+                    execution.running_steps.add(step.id)
+                    _create_task(self._execute_step(step, execution, workflow))
                 
-                # Execute ready steps
-                for step in ready_steps:
-                    if isinstance(step, ParallelStepGroup):
-                        await self._execute_parallel_group(step, execution, workflow)
-                    else:
-                        asyncio.create_task(
-                            self._execute_step(step, execution, workflow)
-                        )
+                if not execution.running_steps:
+                    # Completion, or steps blocked behind failed/unknown dependencies
+                    break
                 
-                # Wait a bit before checking again
-                await asyncio.sleep(0.5)
+                # Wait for a step to complete or fail
+                step = steps_by_id[await execution.settled_steps.get()]
+                execution.running_steps.discard(step.id)
                 
-                # Update completed/failed sets
-                for step in workflow.steps:
-                    if step.status == StepStatus.COMPLETED and step.id not in completed_steps:
-                        completed_steps.add(step.id)
-                        self.logger.info(f"Step completed: {step.name} ({step.id})")
-                    elif step.status == StepStatus.FAILED and step.id not in failed_steps:
-                        failed_steps.add(step.id)
-                        self.logger.error(f"Step failed: {step.name} ({step.id})")
+                if step.id in execution.completed_steps:
+                    self.logger.info(f"Step completed: {step.name} ({step.id})")
+                    release(step.id)
+                else:
+                    self.logger.error(f"Step failed: {step.name} ({step.id})")
             
             # Determine final status
-            if failed_steps:
+            if execution.failed_steps:
                 execution.status = WorkflowStatus.FAILED
-                execution.error = f"Steps failed: {', '.join(failed_steps)}"
+                execution.error = f"Steps failed: {', '.join(execution.failed_steps)}"
             else:
                 execution.status = WorkflowStatus.COMPLETED
             
             execution.completed_at = datetime.utcnow()
+            execution.completed_monotonic = time.monotonic()
+            self._record_execution(execution)
             
             # Emit completion event
             await self._emit_event('workflow_completed', {
                 'execution_id': execution.id,
                 'workflow_id': execution.workflow_id,
                 'status': execution.status,
-                'duration': (execution.completed_at - execution.started_at).total_seconds()
+                'duration': execution.completed_monotonic - execution.started_monotonic
             })
             
         except Exception as e:
             execution.status = WorkflowStatus.FAILED
             execution.error = str(e)
             execution.completed_at = datetime.utcnow()
+            execution.completed_monotonic = time.monotonic()
+            self._record_execution(execution)
             
             log_error_with_context(
                 'virtuai.workflow',
@@ -300,82 +440,95 @@ class WorkflowEngine:
     
     async def _execute_step(self, step: WorkflowStep, execution: WorkflowExecution,
                           workflow: WorkflowDefinition):
-        """Execute a single workflow step"""
-        
+        """Execute a single workflow step, retrying errors up to step.retry_count times"""
         try:
-            step.status = StepStatus.RUNNING
-            step.started_at = datetime.utcnow()
-            execution.current_step = step.id
-            
-            self.logger.info(f"Executing step: {step.name} ({step.id})")
-            
-            # Create task for the step
-            task_data = {
-                'title': f"Workflow Step: {step.name}",
-                'description': step.task_description,
-                'priority': TaskPriority.MEDIUM,
-                'workflow_execution_id': execution.id,
-                'workflow_step_id': step.id
-            }
-            
-            # Add context variables to task description
-            if execution.context:
-                context_str = "\n\nContext:\n" + "\n".join([
-                    f"- {k}: {v}" for k, v in execution.context.items()
-                ])
-                task_data['description'] += context_str
-            
-            # Add previous step results if available
-            if execution.step_results:
-                results_str = "\n\nPrevious Results:\n" + "\n".join([
-                    f"- {k}: {v}" for k, v in execution.step_results.items()
-                ])
-                task_data['description'] += results_str
-            
-            # Find appropriate agent
-            agents = await self.agent_manager.get_agents_by_type(step.agent_type)
-            if not agents:
-                raise ValueError(f"No agents available for type: {step.agent_type}")
-            
-            # Execute with timeout
+            for attempt in range(step.retry_count + 1):
+                try:
+                    await self._attempt_step(step, execution)
+                    return
+                
+                except asyncio.TimeoutError:
+                    step.status = StepStatus.FAILED
+                    step.error = f"Step timed out after {step.timeout_minutes} minutes"
+                    execution.failed_steps.add(step.id)
+                    return
+                
+                except Exception as e:
+                    step.status = StepStatus.FAILED
+                    step.error = str(e)
+                    
+                    retries_left = step.retry_count - attempt
+                    if retries_left > 0:
+                        self.logger.warning(f"Retrying step {step.name}, {retries_left - 1} retries left")
+                        await asyncio.sleep(5)  # Wait before retry
+                    else:
+                        execution.failed_steps.add(step.id)
+                        log_error_with_context(
+                            'virtuai.workflow',
+                            e,
+                            {'step_id': step.id, 'execution_id': execution.id}
+                        )
+        
+        finally:
+            execution.settled_steps.put_nowait(step.id)
+    
+    async def _attempt_step(self, step: WorkflowStep, execution: WorkflowExecution):
+        """Run one attempt of a step; errors propagate to _execute_step"""
+        step.status = StepStatus.RUNNING
+        step.started_at = datetime.utcnow()
+        step.started_monotonic = time.monotonic()
+        execution.current_step = step.id
+        
+        self.logger.info(f"Executing step: {step.name} ({step.id})")
+        
+        # Create task for the step
+        task_data = {
+            'title': f"Workflow Step: {step.name}",
+            'description': step.task_description,
+            'priority': TaskPriority.MEDIUM,
+            'workflow_execution_id': execution.id,
+            'workflow_step_id': step.id
+        }
+        
+        # Add context variables to task description
+        if execution.context:
+            task_data['description'] += "\n\nContext:\n" + execution.render_context()
+        
+        # Add previous step results if available
+        if execution.step_results:
+            task_data['description'] += "\n\nPrevious Results:\n" + execution.render_results()
+        
+        # Find appropriate agent, preferring the one earlier steps of this type ran on
+        agents = await self.agent_manager.get_agents_by_type(step.agent_type)
+        if not agents:
+            raise ValueError(f"No agents available for type: {step.agent_type}")
+        
+        preferred_id = execution.agent_affinity.get(step.agent_type)
+        agent = next((a for a in agents if a.id == preferred_id), agents[0])
+        execution.agent_affinity[step.agent_type] = agent.id
+        
+        # Execute with timeout; time queued for a dispatch slot doesn't count
+        async with self.agent_type_limits[step.agent_type]:
             result = await asyncio.wait_for(
-                self._execute_step_with_agent(task_data, agents[0]),
+                self._execute_step_with_agent(task_data, agent),
                 timeout=step.timeout_minutes * 60
             )
-            
-            step.output = result
-            step.status = StepStatus.COMPLETED
-            step.completed_at = datetime.utcnow()
-            
-            # Store result in execution context
-            execution.step_results[step.id] = result
-            
-            # Update context with step variables
-            if step.metadata.get('output_variables'):
-                for var_name, var_path in step.metadata['output_variables'].items():
-                    # Simple path extraction (could be enhanced)
-                    execution.context[var_name] = result
-            
-        except asyncio.TimeoutError:
-            step.status = StepStatus.FAILED
-            step.error = f"Step timed out after {step.timeout_minutes} minutes"
-            
-        except Exception as e:
-            step.status = StepStatus.FAILED
-            step.error = str(e)
-            
-            # Retry logic
-            if step.retry_count > 0:
-                step.retry_count -= 1
-                self.logger.warning(f"Retrying step {step.name}, {step.retry_count} retries left")
-                await asyncio.sleep(5)  # Wait before retry
-                await self._execute_step(step, execution, workflow)
-            else:
-                log_error_with_context(
-                    'virtuai.workflow',
-                    e,
-                    {'step_id': step.id, 'execution_id': execution.id}
-                )
+        
+        step.output = result
+        step.status = StepStatus.COMPLETED
+        step.completed_at = datetime.utcnow()
+        step.completed_monotonic = time.monotonic()
+        
+        # Store result in execution context
+        execution.set_step_result(step.id, result)
+        
+        # Update context with step variables
+        if step.metadata.get('output_variables'):
+            for var_name, var_path in step.metadata['output_variables'].items():
+                # Simple path extraction (could be enhanced)
+                execution.set_context(var_name, result)
+        
+        execution.completed_steps.add(step.id)
     
     async def _execute_step_with_agent(self, task_data: Dict[str, Any], agent) -> str:
         """Execute a step using an agent"""
@@ -397,34 +550,97 @@ class WorkflowEngine:
                                     workflow: WorkflowDefinition):
         """Execute a group of parallel steps"""
         
-        tasks = []
-        for step in group.steps:
-            task = asyncio.create_task(
-                self._execute_step(step, execution, workflow)
-            )
-            tasks.append(task)
-        
         if group.wait_for_all:
-            # Wait for all steps to complete
-            await asyncio.gather(*tasks, return_exceptions=True)
+            # Wait for all steps to complete; _execute_step records its own failures
+            await _run_all(self._execute_step(step, execution, workflow) for step in group.steps)
         else:
+            tasks = [_create_task(self._execute_step(step, execution, workflow)) for step in group.steps]
+            
             # Wait for first completion
             done, pending = await asyncio.wait(
                 tasks, return_when=asyncio.FIRST_COMPLETED
             )
             
-            # Cancel pending tasks
+            # Cancel pending tasks and let them unwind before returning
             for task in pending:
                 task.cancel()
+            if pending:
+                await asyncio.wait(pending, return_when=asyncio.ALL_COMPLETED)
+            
+            # Only escaped errors need reading; _execute_step records step failures itself
+            for task in done:
+                exc = task.exception()
+                if exc is not None:
+                    log_error_with_context(
+                        'virtuai.workflow',
+                        exc,
+                        {'execution_id': execution.id, 'workflow_id': execution.workflow_id}
+                    )
     
-    def _build_dependency_graph(self, steps: List[WorkflowStep]) -> Dict[str, List[str]]:
-        """Build dependency graph for steps"""
-        graph = {}
+    def _build_dependency_graph(self, steps: List[WorkflowStep]) -> Tuple[Dict[str, int], Dict[str, List[str]]]:
+        """Build dependency graph for steps: in-degree per step and dependents per step"""
+        in_degree = {}
+        dependents = {step.id: [] for step in steps}
         
         for step in steps:
-            graph[step.id] = step.depends_on.copy()
+            in_degree[step.id] = len(step.depends_on)
+            for dep_id in step.depends_on:
+                if dep_id in dependents:
+                    dependents[dep_id].append(step.id)
         
-        return graph
+        return in_degree, dependents
+    
+    def _plan_workflow(self, workflow: WorkflowDefinition) -> _ExecutionPlan:
+        """Precompute the dependency graph and ready-heap ordering for a workflow
+        
+        Ready steps launch longest remaining critical path first. On ties, a step
+        continuing its parent's agent type goes depth-first (same agent, warm
+        context); other steps follow breadth-first in definition order.
+        """
+        in_degree, dependents = self._build_dependency_graph(workflow.steps)
+        critical_paths = self._critical_path_lengths(workflow.steps)
+        steps_by_id = {step.id: step for step in workflow.steps}
+        kinds = {
+            step.id: StepKind.CONDITIONAL if isinstance(step, ConditionalStep) else StepKind.NORMAL
+            for step in workflow.steps
+        }
+        order = {step.id: index for index, step in enumerate(workflow.steps)}
+        
+        roots = [(-critical_paths[step_id], 1, order[step_id], step_id)
+                 for step_id, count in in_degree.items() if count == 0]
+        heapq.heapify(roots)
+        
+        releases = {}
+        for step_id, dependent_ids in dependents.items():
+            agent_type = steps_by_id[step_id].agent_type
+            releases[step_id] = [
+                (dependent_id, (-critical_paths[dependent_id],
+                                0 if steps_by_id[dependent_id].agent_type == agent_type else 1,
+                                order[dependent_id], dependent_id))
+                for dependent_id in dependent_ids
+            ]
+        
+        return _ExecutionPlan(steps_by_id, kinds, in_degree, roots, releases)
+    
+    def _critical_path_lengths(self, steps: List[WorkflowStep]) -> Dict[str, int]:
+        """Longest chain of step timeouts (minutes) from each step to the end of the workflow"""
+        in_degree, dependents = self._build_dependency_graph(steps)
+        
+        # Topological order; steps on cycles or behind unknown dependencies never enter it
+        order = [step_id for step_id, count in in_degree.items() if count == 0]
+        for step_id in order:
+            for dependent_id in dependents[step_id]:
+                in_degree[dependent_id] -= 1
+                if in_degree[dependent_id] == 0:
+                    order.append(dependent_id)
+        
+        lengths = {step.id: step.timeout_minutes for step in steps}
+        timeouts = dict(lengths)
+        for step_id in reversed(order):
+            if dependents[step_id]:
+                lengths[step_id] = timeouts[step_id] + max(lengths[d] for d in dependents[step_id])
+        
+        return lengths
     
     async def pause_execution(self, execution_id: str):
         """Pause a running workflow execution"""
@@ -432,6 +648,7 @@ class WorkflowEngine:
             execution = self.executions[execution_id]
             if execution.status == WorkflowStatus.RUNNING:
                 execution.status = WorkflowStatus.PAUSED
+                self._record_execution(execution)
                 self.logger.info(f"Paused workflow execution: {execution_id}")
     
     async def resume_execution(self, execution_id: str):
@@ -440,6 +657,7 @@ class WorkflowEngine:
             execution = self.executions[execution_id]
             if execution.status == WorkflowStatus.PAUSED:
                 execution.status = WorkflowStatus.RUNNING
+                self._record_execution(execution)
                 self.logger.info(f"Resumed workflow execution: {execution_id}")
     
     async def cancel_execution(self, execution_id: str):
@@ -448,6 +666,8 @@ class WorkflowEngine:
             execution = self.executions[execution_id]
             execution.status = WorkflowStatus.CANCELLED
             execution.completed_at = datetime.utcnow()
+            execution.completed_monotonic = time.monotonic()
+            self._record_execution(execution)
             self.running_executions.discard(execution_id)
             self.logger.info(f"Cancelled workflow execution: {execution_id}")
     
@@ -456,31 +676,36 @@ class WorkflowEngine:
         return self.executions.get(execution_id)
     
     def list_executions(self, workflow_id: str = None) -> List[WorkflowExecution]:
-        """List workflow executions"""
-        executions = list(self.executions.values())
-        
+        """List workflow executions, newest first"""
         if workflow_id:
-            executions = [e for e in executions if e.workflow_id == workflow_id]
+            return list(self.executions_by_workflow.get(workflow_id, ()))
         
-        return sorted(executions, key=lambda x: x.started_at or datetime.min, reverse=True)
+        return list(self.executions_by_time)
     
     def list_workflows(self) -> List[WorkflowDefinition]:
         """List all registered workflows"""
         return list(self.workflows.values())
     
     async def _emit_event(self, event_name: str, data: Dict[str, Any]):
-        """Emit workflow events"""
-        if event_name in self.event_handlers:
-            for handler in self.event_handlers[event_name]:
-                try:
-                    await handler(data)
-                except Exception as e:
-                    self.logger.error(f"Event handler error: {e}")
+        """Emit workflow events, running the event's handlers concurrently"""
+        handlers = self.event_handlers.get(event_name)
+        if not handlers:
+            return
+        
+        if len(handlers) == 1:
+            await self._safe_invoke(handlers[0], data)
+        else:
+            await asyncio.gather(*(self._safe_invoke(handler, data) for handler in handlers))
+    
+    async def _safe_invoke(self, handler: Callable, data: Dict[str, Any]):
+        """Await one event handler, logging instead of raising its errors"""
+        try:
+            await handler(data)
+        except Exception as e:
+            self.logger.error(f"Event handler error: {e}")
     
     def on_event(self, event_name: str, handler: Callable):
         """Register event handler"""
-        if event_name not in self.event_handlers:
-            self.event_handlers[event_name] = []
         self.event_handlers[event_name].append(handler)
     
     async def start_scheduler(self):
@@ -508,72 +733,84 @@ class WorkflowEngine:
         while self.scheduler_running:
             try:
                 await self._check_scheduled_workflows()
-                await asyncio.sleep(60)  # Check every minute
+                
+                # Sleep until the earliest next run or a schedule change. The minute
+                # cap bounds lateness if the wall clock jumps; with nothing scheduled
+                # the loop only wakes on register_workflow.
+                timeout = None
+                if self.schedule_heap:
+                    until_next = (self.schedule_heap[0][0] - datetime.utcnow()).total_seconds()
+                    timeout = min(60.0, max(0.0, until_next))
+                try:
+                    await asyncio.wait_for(self.scheduler_wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self.scheduler_wakeup.clear()
             except Exception as e:
                 log_error_with_context('virtuai.workflow', e)
                 await asyncio.sleep(60)
     
     async def _check_scheduled_workflows(self):
-        """Check for scheduled workflows that need to run"""
+        """Run scheduled workflows whose next run time has arrived"""
         current_time = datetime.utcnow()
         
-        for workflow in self.workflows.values():
-            if workflow.trigger != WorkflowTrigger.SCHEDULED:
-                continue
+        while self.schedule_heap and self.schedule_heap[0][0] <= current_time:
+            run_at, workflow_id = heapq.heappop(self.schedule_heap)
+            if self.next_runs.get(workflow_id) != run_at:
+                continue  # Unregistered or rescheduled since this entry was pushed
+            
+            workflow = self.workflows[workflow_id]
             
-            if not workflow.schedule:
-                continue
+            # Missed runs collapse into this one; the next run is after now
+            self._schedule_next_run(workflow, current_time)
             
-            # Simple cron-like scheduling (could be enhanced with proper cron parser)
-            if self._should_run_scheduled_workflow(workflow, current_time):
-                await self.execute_workflow(workflow.id, {
-                    'scheduled_time': current_time.isoformat(),
-                    'trigger': 'scheduled'
-                })
-    
-    def _should_run_scheduled_workflow(self, workflow: WorkflowDefinition,
-                                     current_time: datetime) -> bool:
-        """Check if a scheduled workflow should run (simplified cron logic)"""
-        # This is a simplified implementation
-        # In production, you'd want to use a proper cron parser like croniter
-        
-        schedule = workflow.schedule.strip()
-        
-        # Handle simple cases
-        if schedule == "* * * * *":  # Every minute
-            return True
-        elif schedule == "0 * * * *":  # Every hour
-            return current_time.minute == 0
-        elif schedule == "0 0 * * *":  # Every day at midnight
-            return current_time.hour == 0 and current_time.minute == 0
-        
-        return False
+            await self.execute_workflow(workflow.id, {
+                'scheduled_time': run_at.isoformat(),
+                'trigger': 'scheduled'
+            })
+    
+    def _schedule_next_run(self, workflow: WorkflowDefinition, after: datetime):
+        """Compute a scheduled workflow's next cron fire time and queue it"""
+        run_at = croniter(workflow.schedule.strip(), after).get_next(datetime)
+        self.next_runs[workflow.id] = run_at
+        heapq.heappush(self.schedule_heap, (run_at, workflow.id))
+    
+    def _record_execution(self, execution: WorkflowExecution):
+        """Copy an execution's status and timestamps into the metrics columns"""
+        slot = self._execution_slots.get(execution.id)
+        if slot is None:
+            slot = len(self._execution_slots)
+            self._execution_slots[execution.id] = slot
+            
+            capacity = len(self._execution_status)
+            if slot >= capacity:
+                self._execution_status = np.resize(self._execution_status, capacity * 2)
+                self._execution_start = np.resize(self._execution_start, capacity * 2)
+                self._execution_end = np.resize(self._execution_end, capacity * 2)
+        
+        self._execution_status[slot] = _WORKFLOW_STATUS_CODES[execution.status]
+        self._execution_start[slot] = np.nan if execution.started_monotonic is None else execution.started_monotonic
+        self._execution_end[slot] = np.nan if execution.completed_monotonic is None else execution.completed_monotonic
     
     def get_workflow_metrics(self) -> Dict[str, Any]:
         """Get workflow execution metrics"""
-        total_executions = len(self.executions)
-        running_executions = len(self.running_executions)
-        
-        status_counts = {}
-        avg_duration = 0
-        completed_count = 0
+        count = len(self._execution_slots)
+        statuses = self._execution_status[:count]
         
-        for execution in self.executions.values():
-            status = execution.status
-            status_counts[status] = status_counts.get(status, 0) + 1
-            
-            if execution.status == WorkflowStatus.COMPLETED and execution.started_at and execution.completed_at:
-                duration = (execution.completed_at - execution.started_at).total_seconds()
-                avg_duration += duration
-                completed_count += 1
+        status_counts = np.bincount(statuses, minlength=len(_WORKFLOW_STATUSES))
         
-        if completed_count > 0:
-            avg_duration = avg_duration / completed_count
+        # NaN durations (missing timestamps) are excluded
+        completed = statuses == _WORKFLOW_STATUS_CODES[WorkflowStatus.COMPLETED]
+        durations = self._execution_end[:count][completed] - self._execution_start[:count][completed]
+        durations = durations[~np.isnan(durations)]
+        avg_duration = float(durations.mean()) if len(durations) else 0
         
         return {
-            'total_executions': total_executions,
-            'running_executions': running_executions,
-            'status_distribution': status_counts,
+            'total_executions': len(self.executions),
+            'running_executions': len(self.running_executions),
+            'status_distribution': {
+                _WORKFLOW_STATUSES[code]: int(n) for code, n in enumerate(status_counts) if n
+            },
             'average_duration_seconds': avg_duration,
             'registered_workflows': len(self.workflows),
             'scheduler_running': self.scheduler_running
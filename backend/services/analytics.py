@@ -1,20 +1,32 @@
 # VirtuAI Office - Analytics Service
 import asyncio
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, Callable, Awaitable
 from dataclasses import dataclass
+from collections import defaultdict, OrderedDict
 from enum import Enum
+import math
+import re
 import statistics
 import json
+import time
 
-from sqlalchemy import func, and_, or_
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func, and_, or_, case, cast, Integer
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from ..models.database import Task, Agent, Project, PerformanceMetric, TaskStatus, TaskPriority, AgentType
+from ..models.database import (
+    Task, Agent, Project, PerformanceMetric, TaskStatus, TaskPriority, AgentType, get_async_session_factory
+)
 from ..core.logging import get_logger, log_performance_metric
 
 logger = get_logger('virtuai.analytics')
 
+# Output quality indicators
+_RE_HEADERS = re.compile(r'(#{1,6}|\*\*[^*]+\*\*)')
+_RE_CODE = re.compile(r'```|`[^`]+`')
+_RE_LISTS = re.compile(r'(\n\s*[-*+]\s|\n\s*\d+\.\s)')
+_EXPLANATION_WORDS = ('because', 'since', 'therefore', 'due to')
+
 
 class MetricType(str, Enum):
     PRODUCTIVITY = "productivity"
@@ -90,10 +102,46 @@ class ProjectAnalytics:
     risk_factors: List[str]
 
 
+class _TTLCache:
+    """LRU mapping capped at maxsize entries, each expiring ttl seconds after it is set"""
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return default
+        
+        self._entries.move_to_end(key)
+        return value
+    
+    def __setitem__(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def clear(self):
+        self._entries.clear()
+
+
 class AnalyticsService:
-    def __init__(self):
-        self.cache = {}
+    def __init__(self, session_factory: Optional[async_sessionmaker] = None):
+        self.session_factory = session_factory  # Sessions for shared computations; the app's async factory by default
         self.cache_ttl = timedelta(minutes=5)
+        self.cache = _TTLCache(maxsize=256, ttl=self.cache_ttl.total_seconds())
+        self._inflight: Dict[str, asyncio.Task] = {}  # cache_key -> computation shared by concurrent misses
     
     def _get_time_range_filter(self, time_range: TimeRange) -> datetime:
         """Get datetime filter for time range"""
@@ -126,51 +174,74 @@ class AnalyticsService:
         
         return change_pct, trend
     
-    async def get_team_analytics(self, db: Session, time_range: TimeRange = TimeRange.WEEK) -> TeamAnalytics:
+    async def _status_counts(self, db: AsyncSession, *criteria) -> Dict[TaskStatus, int]:
+        """Count tasks matching the criteria per status, in one GROUP BY query"""
+        rows = await db.execute(
+            select(Task.status, func.count(Task.id)).where(*criteria).group_by(Task.status)
+        )
+        return dict(rows.all())
+    
+    async def _cached(self, cache_key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Return a cached result, computing it once for all callers that miss together
+        
+        compute must not use any caller's session: the shared computation can
+        outlive the caller that started it, so it opens a session of its own.
+        """
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(self._compute_and_cache(cache_key, compute))
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        
+        # Shielded so one caller being cancelled doesn't cancel the others' result
+        return await asyncio.shield(task)
+    
+    async def _compute_and_cache(self, cache_key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        result = await compute()
+        self.cache[cache_key] = result
+        return result
+    
+    async def _in_new_session(self, method: Callable[..., Awaitable[Any]], *args) -> Any:
+        """Run a service method with a session of its own"""
+        session_factory = self.session_factory or get_async_session_factory()
+        async with session_factory() as db:
+            return await method(db, *args)
+    
+    async def get_team_analytics(self, db: AsyncSession, time_range: TimeRange = TimeRange.WEEK) -> TeamAnalytics:
         """Get comprehensive team analytics"""
-        
-        cache_key = f"team_analytics_{time_range.value}"
-        if cache_key in self.cache:
-            cached_data, timestamp = self.cache[cache_key]
-            if datetime.utcnow() - timestamp < self.cache_ttl:
-                return cached_data
-        
+        return await self._cached(
+            f"team_analytics_{time_range.value}",
+            lambda: self._in_new_session(self._compute_team_analytics, time_range)
+        )
+    
+    async def _compute_team_analytics(self, db: AsyncSession, time_range: TimeRange) -> TeamAnalytics:
         start_date = self._get_time_range_filter(time_range)
         
         # Basic task metrics
-        total_tasks = db.query(Task).filter(Task.created_at >= start_date).count()
-        completed_tasks = db.query(Task).filter(
-            and_(Task.created_at >= start_date, Task.status == TaskStatus.COMPLETED)
-        ).count()
-        in_progress_tasks = db.query(Task).filter(
-            and_(Task.created_at >= start_date, Task.status == TaskStatus.IN_PROGRESS)
-        ).count()
-        pending_tasks = db.query(Task).filter(
-            and_(Task.created_at >= start_date, Task.status == TaskStatus.PENDING)
-        ).count()
-        failed_tasks = db.query(Task).filter(
-            and_(Task.created_at >= start_date, Task.status == TaskStatus.FAILED)
-        ).count()
+        status_counts = await self._status_counts(db, Task.created_at >= start_date)
+        total_tasks = sum(status_counts.values())
+        completed_tasks = status_counts.get(TaskStatus.COMPLETED, 0)
+        in_progress_tasks = status_counts.get(TaskStatus.IN_PROGRESS, 0)
+        pending_tasks = status_counts.get(TaskStatus.PENDING, 0)
+        failed_tasks = status_counts.get(TaskStatus.FAILED, 0)
         
         completion_rate = completed_tasks / total_tasks if total_tasks > 0 else 0
         
         # Average completion time
-        completed_task_times = db.query(Task).filter(
-            and_(
-                Task.completed_at >= start_date,
-                Task.status == TaskStatus.COMPLETED,
-                Task.started_at.isnot(None),
-                Task.completed_at.isnot(None)
+        avg_completion_time = await db.scalar(
+            select(func.avg(self._duration_hours(db, Task.started_at, Task.completed_at))).where(
+                and_(
+                    Task.completed_at >= start_date,
+                    Task.status == TaskStatus.COMPLETED,
+                    Task.started_at.isnot(None),
+                    Task.completed_at.isnot(None)
+                )
             )
-        ).all()
-        
-        completion_times = []
-        for task in completed_task_times:
-            if task.started_at and task.completed_at:
-                duration = (task.completed_at - task.started_at).total_seconds() / 3600
-                completion_times.append(duration)
-        
-        avg_completion_time = statistics.mean(completion_times) if completion_times else 0
+        ) or 0
         
         # Team velocity (tasks completed per day)
         days_in_range = (datetime.utcnow() - start_date).days or 1
@@ -209,115 +280,119 @@ class AnalyticsService:
             agent_performance=agent_performance
         )
         
-        # Cache results
-        self.cache[cache_key] = (analytics, datetime.utcnow())
-        
         return analytics
     
-    async def _get_all_agent_performance(self, db: Session, time_range: TimeRange) -> List[AgentPerformanceReport]:
+    async def _get_all_agent_performance(self, db: AsyncSession, time_range: TimeRange) -> List[AgentPerformanceReport]:
         """Get performance reports for all agents"""
-        agents = db.query(Agent).filter(Agent.is_active == True).all()
-        performance_reports = []
-        
-        for agent in agents:
-            report = await self.get_agent_performance(db, agent.id, time_range)
-            performance_reports.append(report)
-        
-        return performance_reports
+        agents = (await db.scalars(select(Agent).where(Agent.is_active == True))).all()
+        return await self._build_agent_reports(db, agents, time_range)
     
-    async def get_agent_performance(self, db: Session, agent_id: str, time_range: TimeRange = TimeRange.WEEK) -> AgentPerformanceReport:
+    async def get_agent_performance(self, db: AsyncSession, agent_id: str, time_range: TimeRange = TimeRange.WEEK) -> AgentPerformanceReport:
         """Get detailed performance report for a specific agent"""
-        
-        start_date = self._get_time_range_filter(time_range)
-        
+        return await self._cached(
+            f"agent_performance_{agent_id}_{time_range.value}",
+            lambda: self._in_new_session(self._compute_agent_performance, agent_id, time_range)
+        )
+    
+    async def _compute_agent_performance(self, db: AsyncSession, agent_id: str,
+                                         time_range: TimeRange) -> AgentPerformanceReport:
         # Get agent info
-        agent = db.query(Agent).filter(Agent.id == agent_id).first()
+        agent = await db.get(Agent, agent_id)
         if not agent:
             raise ValueError(f"Agent {agent_id} not found")
         
-        # Basic task metrics
-        total_tasks = db.query(Task).filter(
-            and_(Task.agent_id == agent_id, Task.created_at >= start_date)
-        ).count()
-        
-        completed_tasks = db.query(Task).filter(
-            and_(
-                Task.agent_id == agent_id,
-                Task.created_at >= start_date,
-                Task.status == TaskStatus.COMPLETED
-            )
-        ).count()
-        
-        failed_tasks = db.query(Task).filter(
-            and_(
-                Task.agent_id == agent_id,
-                Task.created_at >= start_date,
-                Task.status == TaskStatus.FAILED
-            )
-        ).count()
-        
-        success_rate = completed_tasks / total_tasks if total_tasks > 0 else 0
-        
-        # Average completion time
-        completed_task_objects = db.query(Task).filter(
-            and_(
-                Task.agent_id == agent_id,
-                Task.completed_at >= start_date,
-                Task.status == TaskStatus.COMPLETED,
-                Task.started_at.isnot(None),
-                Task.completed_at.isnot(None)
-            )
-        ).all()
-        
-        completion_times = []
-        for task in completed_task_objects:
-            if task.started_at and task.completed_at:
-                duration = (task.completed_at - task.started_at).total_seconds() / 3600
-                completion_times.append(duration)
-        
-        avg_completion_time = statistics.mean(completion_times) if completion_times else 0
-        
-        # Quality score (based on output length, structure, etc.)
-        quality_scores = []
-        for task in completed_task_objects:
-            if task.output:
-                score = self._assess_output_quality(task.output)
-                quality_scores.append(score)
-        
-        quality_score = statistics.mean(quality_scores) if quality_scores else 0
-        
-        # Productivity score
-        productivity_factors = [
-            success_rate * 50,  # 50% success rate
-            (1 / (avg_completion_time + 1)) * 30,  # 30% speed (inverse of time)
-            quality_score * 20  # 20% quality
-        ]
-        productivity_score = sum(productivity_factors)
+        reports = await self._build_agent_reports(db, [agent], time_range)
+        return reports[0]
+    
+    async def _build_agent_reports(self, db: AsyncSession, agents: List[Agent],
+                                   time_range: TimeRange) -> List[AgentPerformanceReport]:
+        """Build performance reports for a set of agents from grouped queries"""
+        if not agents:
+            return []
         
-        # Collaboration count (tasks involving multiple agents)
-        collaboration_count = 0  # TODO: Implement when collaboration tracking is added
+        start_date = self._get_time_range_filter(time_range)
+        agent_ids = [agent.id for agent in agents]
+        
+        # Basic task metrics: one count per (agent, status)
+        status_counts: Dict[str, Dict[TaskStatus, int]] = defaultdict(dict)
+        status_rows = await db.execute(
+            select(Task.agent_id, Task.status, func.count(Task.id)).where(
+                and_(Task.agent_id.in_(agent_ids), Task.created_at >= start_date)
+            ).group_by(Task.agent_id, Task.status)
+        )
+        for agent_id, status, count in status_rows:
+            status_counts[agent_id][status] = count
+        
+        completed_filter = and_(
+            Task.agent_id.in_(agent_ids),
+            Task.completed_at >= start_date,
+            Task.status == TaskStatus.COMPLETED,
+            Task.started_at.isnot(None),
+            Task.completed_at.isnot(None)
+        )
         
-        # Recent activity
-        recent_activity = await self._get_agent_recent_activity(db, agent_id, 10)
+        # Average completion time per agent, computed by the database
+        avg_completion_times = dict((await db.execute(
+            select(Task.agent_id, func.avg(self._duration_hours(db, Task.started_at, Task.completed_at)))
+            .where(completed_filter).group_by(Task.agent_id)
+        )).all())
+        
+        # Quality score (based on output length, structure, etc.); streams only the text column
+        quality_scores: Dict[str, List[float]] = defaultdict(list)
+        outputs = await db.stream(
+            select(Task.agent_id, Task.output).where(
+                and_(completed_filter, Task.output.isnot(None), Task.output != '')
+            ).execution_options(yield_per=500)
+        )
+        async for agent_id, output in outputs:
+            quality_scores[agent_id].append(self._assess_output_quality(output))
         
-        # Performance trend
-        performance_trend = await self._get_agent_performance_trend(db, agent_id, time_range)
+        # Recent activity and daily performance trend
+        recent_activity = await self._get_recent_activity(db, agent_ids, 10)
+        performance_trends = await self._get_performance_trends(db, agent_ids, start_date)
         
-        return AgentPerformanceReport(
-            agent_id=agent_id,
-            agent_name=agent.name,
-            agent_type=agent.type,
-            total_tasks=total_tasks,
-            completed_tasks=completed_tasks,
-            failed_tasks=failed_tasks,
-            avg_completion_time=avg_completion_time,
-            success_rate=success_rate,
-            quality_score=quality_score,
-            productivity_score=productivity_score,
-            collaboration_count=collaboration_count,
-            recent_activity=recent_activity,
-            performance_trend=performance_trend
-        )
+        reports = []
+        for agent in agents:
+            counts = status_counts.get(agent.id, {})
+            total_tasks = sum(counts.values())
+            completed_tasks = counts.get(TaskStatus.COMPLETED, 0)
+            failed_tasks = counts.get(TaskStatus.FAILED, 0)
+            
+            success_rate = completed_tasks / total_tasks if total_tasks > 0 else 0
+            
+            avg_completion_time = avg_completion_times.get(agent.id) or 0
+            
+            scores = quality_scores.get(agent.id)
+            quality_score = statistics.mean(scores) if scores else 0
+            
+            # Productivity score
+            productivity_factors = [
+                success_rate * 50,  # 50% success rate
+                (1 / (avg_completion_time + 1)) * 30,  # 30% speed (inverse of time)
+                quality_score * 20  # 20% quality
+            ]
+            productivity_score = sum(productivity_factors)
+            
+            # Collaboration count (tasks involving multiple agents)
+            collaboration_count = 0  # TODO: Implement when collaboration tracking is added
+            
+            reports.append(AgentPerformanceReport(
+                agent_id=agent.id,
+                agent_name=agent.name,
+                agent_type=agent.type,
+                total_tasks=total_tasks,
+                completed_tasks=completed_tasks,
+                failed_tasks=failed_tasks,
+                avg_completion_time=avg_completion_time,
+                success_rate=success_rate,
+                quality_score=quality_score,
+                productivity_score=productivity_score,
+                collaboration_count=collaboration_count,
+                recent_activity=recent_activity.get(agent.id, []),
+                performance_trend=performance_trends[agent.id]
+            ))
+        
+        return reports
     
     def _assess_output_quality(self, output: str) -> float:
         """Assess quality of agent output (0-1 score)"""
@@ -336,9 +411,9 @@ class AnalyticsService:
             score += 0.1
         
         # Structure indicators
-        has_headers = bool(re.search(r'(#{1,6}|\*\*[^*]+\*\*)', output))
-        has_code = bool(re.search(r'```|`[^`]+`', output))
-        has_lists = bool(re.search(r'(\n\s*[-*+]\s|\n\s*\d+\.\s)', output))
+        has_headers = bool(_RE_HEADERS.search(output))
+        has_code = bool(_RE_CODE.search(output))
+        has_lists = bool(_RE_LISTS.search(output))
         
         if has_headers:
             score += 0.2
@@ -348,8 +423,9 @@ class AnalyticsService:
             score += 0.2
         
         # Content quality indicators
-        has_examples = 'example' in output.lower()
-        has_explanations = any(word in output.lower() for word in ['because', 'since', 'therefore', 'due to'])
+        lowered = output.lower()
+        has_examples = 'example' in lowered
+        has_explanations = any(word in lowered for word in _EXPLANATION_WORDS)
         
         if has_examples:
             score += 0.1
@@ -358,15 +434,24 @@ class AnalyticsService:
         
         return min(score, 1.0)
     
-    async def _get_agent_recent_activity(self, db: Session, agent_id: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get recent activity for an agent"""
-        recent_tasks = db.query(Task).filter(
-            Task.agent_id == agent_id
-        ).order_by(Task.created_at.desc()).limit(limit).all()
-        
-        activity = []
+    async def _get_recent_activity(self, db: AsyncSession, agent_ids: List[str],
+                                   limit: int = 10) -> Dict[str, List[Dict[str, Any]]]:
+        """Get the most recent tasks of each agent, ranked per agent in one query"""
+        rank = func.row_number().over(
+            partition_by=Task.agent_id, order_by=Task.created_at.desc()
+        ).label('rank')
+        ranked = select(
+            Task.id, Task.agent_id, Task.title, Task.status,
+            Task.created_at, Task.started_at, Task.completed_at, rank
+        ).where(Task.agent_id.in_(agent_ids)).subquery()
+        
+        recent_tasks = (await db.execute(
+            select(ranked).where(ranked.c.rank <= limit).order_by(ranked.c.agent_id, ranked.c.rank)
+        )).all()
+        
+        activity: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
         for task in recent_tasks:
-            activity.append({
+            activity[task.agent_id].append({
                 'task_id': task.id,
                 'title': task.title,
                 'status': task.status.value,
@@ -380,90 +465,111 @@ class AnalyticsService:
         
         return activity
     
-    async def _get_agent_performance_trend(self, db: Session, agent_id: str, time_range: TimeRange) -> List[Dict[str, Any]]:
-        """Get performance trend data for an agent"""
-        start_date = self._get_time_range_filter(time_range)
-        
-        # Get daily performance data
-        trend_data = []
-        current_date = start_date
-        
-        while current_date < datetime.utcnow():
-            next_date = current_date + timedelta(days=1)
-            
-            daily_completed = db.query(Task).filter(
+    def _duration_hours(self, db: AsyncSession, start_column, end_column):
+        """SQL expression for the hours between two datetime columns"""
+        if db.get_bind().dialect.name == 'sqlite':
+            return (func.julianday(end_column) - func.julianday(start_column)) * 24
+        return func.extract('epoch', end_column - start_column) / 3600.0
+    
+    def _elapsed_days(self, db: AsyncSession, column, start_date: datetime):
+        """SQL expression for the whole days from start_date to a datetime column"""
+        if db.get_bind().dialect.name == 'sqlite':
+            return cast(func.julianday(column) - func.julianday(start_date), Integer)
+        return cast(func.floor(func.extract('epoch', column - start_date) / 86400), Integer)
+    
+    async def _get_performance_trends(self, db: AsyncSession, agent_ids: List[str],
+                                      start_date: datetime) -> Dict[str, List[Dict[str, Any]]]:
+        """Get daily performance trend data for agents, bucketed in SQL"""
+        # Days are counted from start_date, so the last one may be partial
+        days = math.ceil((datetime.utcnow() - start_date) / timedelta(days=1))
+        end_date = start_date + timedelta(days=days)
+        
+        completed_day = self._elapsed_days(db, Task.completed_at, start_date).label('day')
+        completed_rows = await db.execute(
+            select(Task.agent_id, completed_day, func.count(Task.id)).where(
                 and_(
-                    Task.agent_id == agent_id,
-                    Task.completed_at >= current_date,
-                    Task.completed_at < next_date,
+                    Task.agent_id.in_(agent_ids),
+                    Task.completed_at >= start_date,
+                    Task.completed_at < end_date,
                     Task.status == TaskStatus.COMPLETED
                 )
-            ).count()
-            
-            daily_total = db.query(Task).filter(
+            ).group_by(Task.agent_id, completed_day)
+        )
+        
+        created_day = self._elapsed_days(db, Task.created_at, start_date).label('day')
+        total_rows = await db.execute(
+            select(Task.agent_id, created_day, func.count(Task.id)).where(
                 and_(
-                    Task.agent_id == agent_id,
-                    Task.created_at >= current_date,
-                    Task.created_at < next_date
+                    Task.agent_id.in_(agent_ids),
+                    Task.created_at >= start_date,
+                    Task.created_at < end_date
                 )
-            ).count()
-            
-            trend_data.append({
-                'date': current_date.strftime('%Y-%m-%d'),
-                'completed_tasks': daily_completed,
-                'total_tasks': daily_total,
-                'success_rate': daily_completed / daily_total if daily_total > 0 else 0
-            })
-            
-            current_date = next_date
+            ).group_by(Task.agent_id, created_day)
+        )
         
-        return trend_data
+        completed = {(agent_id, day): count for agent_id, day, count in completed_rows}
+        totals = {(agent_id, day): count for agent_id, day, count in total_rows}
+        dates = [(start_date + timedelta(days=day)).strftime('%Y-%m-%d') for day in range(days)]
+        
+        trends = {}
+        for agent_id in agent_ids:
+            trend_data = []
+            for day, date in enumerate(dates):
+                daily_completed = completed.get((agent_id, day), 0)
+                daily_total = totals.get((agent_id, day), 0)
+                trend_data.append({
+                    'date': date,
+                    'completed_tasks': daily_completed,
+                    'total_tasks': daily_total,
+                    'success_rate': daily_completed / daily_total if daily_total > 0 else 0
+                })
+            trends[agent_id] = trend_data
+        
+        return trends
     
-    async def _identify_bottlenecks(self, db: Session, time_range: TimeRange) -> List[str]:
+    async def _identify_bottlenecks(self, db: AsyncSession, time_range: TimeRange) -> List[str]:
         """Identify system bottlenecks"""
         bottlenecks = []
         start_date = self._get_time_range_filter(time_range)
         
         # Check for tasks stuck in pending status
-        old_pending = db.query(Task).filter(
-            and_(
-                Task.status == TaskStatus.PENDING,
-                Task.created_at < datetime.utcnow() - timedelta(hours=1)
+        old_pending = await db.scalar(
+            select(func.count(Task.id)).where(
+                and_(
+                    Task.status == TaskStatus.PENDING,
+                    Task.created_at < datetime.utcnow() - timedelta(hours=1)
+                )
             )
-        ).count()
+        )
         
         if old_pending > 5:
             bottlenecks.append(f"{old_pending} tasks stuck in pending status for over 1 hour")
         
-        # Check for overloaded agents
-        agents = db.query(Agent).filter(Agent.is_active == True).all()
-        for agent in agents:
-            active_tasks = db.query(Task).filter(
+        # Check for overloaded agents: only those over the limit come back
+        active_tasks = func.count(Task.id)
+        overloaded = await db.execute(
+            select(Agent.name, active_tasks).join(Task, Task.agent_id == Agent.id).where(
                 and_(
-                    Task.agent_id == agent.id,
+                    Agent.is_active == True,
                     Task.status.in_([TaskStatus.PENDING, TaskStatus.IN_PROGRESS])
                 )
-            ).count()
-            
-            if active_tasks > 10:
-                bottlenecks.append(f"Agent {agent.name} is overloaded with {active_tasks} active tasks")
+            ).group_by(Agent.id, Agent.name).having(active_tasks > 10)
+        )
         
-        # Check for high failure rate
-        recent_failed = db.query(Task).filter(
-            and_(
-                Task.created_at >= start_date,
-                Task.status == TaskStatus.FAILED
-            )
-        ).count()
+        for agent_name, count in overloaded:
+            bottlenecks.append(f"Agent {agent_name} is overloaded with {count} active tasks")
         
-        recent_total = db.query(Task).filter(Task.created_at >= start_date).count()
+        # Check for high failure rate
+        recent_counts = await self._status_counts(db, Task.created_at >= start_date)
+        recent_failed = recent_counts.get(TaskStatus.FAILED, 0)
+        recent_total = sum(recent_counts.values())
         
         if recent_total > 0 and (recent_failed / recent_total) > 0.2:
             bottlenecks.append(f"High failure rate: {(recent_failed/recent_total*100):.1f}% of recent tasks failed")
         
         return bottlenecks
     
-    async def _generate_recommendations(self, db: Session, completion_rate: float,
+    async def _generate_recommendations(self, db: AsyncSession, completion_rate: float,
                                       team_velocity: float, bottlenecks: List[str]) -> List[str]:
         """Generate recommendations based on analytics"""
         recommendations = []
@@ -495,12 +601,14 @@ class AnalyticsService:
         
         return recommendations
     
-    async def _get_system_metrics(self, db: Session) -> Dict[str, float]:
+    async def _get_system_metrics(self, db: AsyncSession) -> Dict[str, float]:
         """Get system performance metrics"""
         # Get recent performance metrics
-        recent_metrics = db.query(PerformanceMetric).filter(
-            PerformanceMetric.timestamp >= datetime.utcnow() - timedelta(hours=1)
-        ).all()
+        recent_metrics = (await db.scalars(
+            select(PerformanceMetric).where(
+                PerformanceMetric.timestamp >= datetime.utcnow() - timedelta(hours=1)
+            )
+        )).all()
         
         metrics = {}
         
@@ -519,27 +627,32 @@ class AnalyticsService:
         
         return metrics
     
-    async def get_project_analytics(self, db: Session, project_id: str) -> ProjectAnalytics:
+    async def get_project_analytics(self, db: AsyncSession, project_id: str) -> ProjectAnalytics:
         """Get analytics for a specific project"""
-        project = db.query(Project).filter(Project.id == project_id).first()
+        return await self._cached(
+            f"project_analytics_{project_id}",
+            lambda: self._in_new_session(self._compute_project_analytics, project_id)
+        )
+    
+    async def _compute_project_analytics(self, db: AsyncSession, project_id: str) -> ProjectAnalytics:
+        project = await db.get(Project, project_id)
         if not project:
             raise ValueError(f"Project {project_id} not found")
         
         # Basic project metrics
-        total_tasks = db.query(Task).filter(Task.project_id == project_id).count()
-        completed_tasks = db.query(Task).filter(
-            and_(Task.project_id == project_id, Task.status == TaskStatus.COMPLETED)
-        ).count()
+        status_counts = await self._status_counts(db, Task.project_id == project_id)
+        total_tasks = sum(status_counts.values())
+        completed_tasks = status_counts.get(TaskStatus.COMPLETED, 0)
         
         completion_rate = completed_tasks / total_tasks if total_tasks > 0 else 0
         
-        # Resource allocation (agent distribution)
-        resource_allocation = {}
-        project_tasks = db.query(Task).filter(Task.project_id == project_id).all()
-        
-        for task in project_tasks:
-            if task.agent and task.agent.name:
-                resource_allocation[task.agent.name] = resource_allocation.get(task.agent.name, 0) + 1
+        # Resource allocation (agent distribution); joined rather than lazy-loading task.agent
+        allocation_rows = await db.execute(
+            select(Agent.name, func.count(Task.id)).join(Task, Task.agent_id == Agent.id).where(
+                and_(Task.project_id == project_id, Agent.name.isnot(None), Agent.name != '')
+            ).group_by(Agent.name)
+        )
+        resource_allocation = dict(allocation_rows.all())
         
         # Convert to percentages
         if total_tasks > 0:
@@ -558,9 +671,7 @@ class AnalyticsService:
         if completion_rate < 0.5 and total_tasks > 10:
             risk_factors.append("Low completion rate may indicate project complexity issues")
         
-        pending_tasks = db.query(Task).filter(
-            and_(Task.project_id == project_id, Task.status == TaskStatus.PENDING)
-        ).count()
+        pending_tasks = status_counts.get(TaskStatus.PENDING, 0)
         
         if pending_tasks > total_tasks * 0.5:
             risk_factors.append("High number of pending tasks may cause delays")
@@ -577,30 +688,34 @@ class AnalyticsService:
             risk_factors=risk_factors
         )
     
-    async def get_metrics_dashboard(self, db: Session, time_range: TimeRange = TimeRange.DAY) -> Dict[str, AnalyticsMetric]:
+    async def get_metrics_dashboard(self, db: AsyncSession, time_range: TimeRange = TimeRange.DAY) -> Dict[str, AnalyticsMetric]:
         """Get key metrics for dashboard display"""
+        return await self._cached(
+            f"metrics_dashboard_{time_range.value}",
+            lambda: self._in_new_session(self._compute_metrics_dashboard, time_range)
+        )
+    
+    async def _compute_metrics_dashboard(self, db: AsyncSession, time_range: TimeRange) -> Dict[str, AnalyticsMetric]:
         start_date = self._get_time_range_filter(time_range)
         previous_start = start_date - (datetime.utcnow() - start_date)
         
         metrics = {}
         
-        # Task completion rate
-        current_completed = db.query(Task).filter(
-            and_(Task.completed_at >= start_date, Task.status == TaskStatus.COMPLETED)
-        ).count()
-        current_total = db.query(Task).filter(Task.created_at >= start_date).count()
-        current_rate = current_completed / current_total if current_total > 0 else 0
-        
-        previous_completed = db.query(Task).filter(
-            and_(
-                Task.completed_at >= previous_start,
-                Task.completed_at < start_date,
-                Task.status == TaskStatus.COMPLETED
+        # Task completion rate: completions count by completed_at, totals by
+        # created_at, both windows from a single conditional aggregate
+        is_completed = Task.status == TaskStatus.COMPLETED
+        current_completed, current_total, previous_completed, previous_total = (await db.execute(
+            select(
+                func.count(case((and_(is_completed, Task.completed_at >= start_date), 1))),
+                func.count(case((Task.created_at >= start_date, 1))),
+                func.count(case((and_(is_completed, Task.completed_at >= previous_start,
+                                      Task.completed_at < start_date), 1))),
+                func.count(case((and_(Task.created_at >= previous_start, Task.created_at < start_date), 1)))
+            ).where(
+                or_(Task.created_at >= previous_start, Task.completed_at >= previous_start)
             )
-        ).count()
-        previous_total = db.query(Task).filter(
-            and_(Task.created_at >= previous_start, Task.created_at < start_date)
-        ).count()
+        )).one()
+        current_rate = current_completed / current_total if current_total > 0 else 0
         previous_rate = previous_completed / previous_total if previous_total > 0 else 0
         
         change_pct, trend = self._calculate_trend(current_rate, previous_rate)
@@ -615,9 +730,9 @@ class AnalyticsService:
         )
         
         # Average response time
-        current_metrics = db.query(PerformanceMetric).filter(
-            PerformanceMetric.timestamp >= start_date
-        ).all()
+        current_metrics = (await db.scalars(
+            select(PerformanceMetric).where(PerformanceMetric.timestamp >= start_date)
+        )).all()
         
         if current_metrics:
             response_times = [m.processing_time for m in current_metrics if m.processing_time]
@@ -631,7 +746,7 @@ class AnalyticsService:
                 )
         
         # Active agents
-        active_agents = db.query(Agent).filter(Agent.is_active == True).count()
+        active_agents = await db.scalar(select(func.count(Agent.id)).where(Agent.is_active == True))
         metrics['active_agents'] = AnalyticsMetric(
             name="Active Agents",
             value=active_agents,
@@ -652,20 +767,30 @@ class AnalyticsService:
         
         return metrics
     
-    async def export_analytics_report(self, db: Session, time_range: TimeRange = TimeRange.MONTH) -> Dict[str, Any]:
+    async def export_analytics_report(self, db: AsyncSession, time_range: TimeRange = TimeRange.MONTH) -> Dict[str, Any]:
         """Export comprehensive analytics report"""
-        team_analytics = await self.get_team_analytics(db, time_range)
-        metrics_dashboard = await self.get_metrics_dashboard(db, time_range)
+        projects = (await db.scalars(select(Project))).all()
+        
+        # Team, dashboard and per-project analytics are independent; run them
+        # together (each computes in a session of its own)
+        team_analytics, metrics_dashboard, *project_results = await asyncio.gather(
+            self.get_team_analytics(db, time_range),
+            self.get_metrics_dashboard(db, time_range),
+            *(self.get_project_analytics(db, project.id) for project in projects),
+            return_exceptions=True
+        )
+        
+        for result in (team_analytics, metrics_dashboard):
+            if isinstance(result, Exception):
+                raise result
         
-        # Get all projects analytics
-        projects = db.query(Project).all()
+        # A failed project is left out of the report rather than failing it
         project_analytics = []
-        for project in projects:
-            try:
-                analytics = await self.get_project_analytics(db, project.id)
-                project_analytics.append(analytics)
-            except Exception as e:
-                logger.warning(f"Failed to get analytics for project {project.id}: {e}")
+        for project, result in zip(projects, project_results):
+            if isinstance(result, Exception):
+                logger.warning(f"Failed to get analytics for project {project.id}: {result}")
+            else:
+                project_analytics.append(result)
         
         report = {
             'generated_at': datetime.utcnow().isoformat(),
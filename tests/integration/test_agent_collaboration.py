@@ -1 +1,248 @@
-# Agent collaboration tests - TBD
\ No newline at end of file
+# Agent collaboration tests
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import Column, MetaData, Table, Text, create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.orchestration.collaboration import (
+    Base,
+    CollaborationEfficiency,
+    CollaborationManager,
+    CollaborationStepRecord,
+    CollaborationType,
+    migrate_collaboration_tables,
+)
+
+
+class FakeAgent:
+    def __init__(self, agent_id, agent_type, fail=False):
+        self.id = agent_id
+        self.name = agent_id.title()
+        self.type = SimpleNamespace(value=agent_type)
+        self.fail = fail
+
+    async def process_task(self, task):
+        if self.fail:
+            raise RuntimeError(f"{self.id} failed")
+        return f"{self.name} output for {task.title}"
+
+
+class RecordingAgent(FakeAgent):
+    """Logs when each step starts and ends, giving other steps time to run in between"""
+
+    def __init__(self, agent_id, agent_type, events):
+        super().__init__(agent_id, agent_type)
+        self.events = events
+
+    async def process_task(self, task):
+        step = task.title.split(": ", 1)[1]
+        self.events.append(("start", step))
+        await asyncio.sleep(0.01)
+        self.events.append(("end", step))
+        return await super().process_task(task)
+
+
+class FakeAgentManager:
+    def __init__(self, agents):
+        self.agents = {agent.id: agent for agent in agents}
+
+    def get_agent_by_id(self, agent_id):
+        return self.agents.get(agent_id)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def agents():
+    return [
+        FakeAgent("frontend", "frontend_developer"),
+        FakeAgent("backend", "backend_developer"),
+    ]
+
+
+def create_legacy_tables(engine):
+    """Create the collaboration tables as releases before the JSON and *_ns columns did"""
+    legacy = MetaData()
+    for table in Base.metadata.sorted_tables:
+        Table(table.name, legacy, *[
+            Column(column.name, Text if column.name == "agents_involved" else column.type,
+                   primary_key=column.primary_key)
+            for column in table.columns
+            if not column.name.endswith("_ns")
+        ])
+    legacy.create_all(engine)
+    return legacy
+
+
+def step_statuses(db, collaboration_id):
+    rows = db.query(CollaborationStepRecord.status).filter(
+        CollaborationStepRecord.collaboration_id == collaboration_id
+    ).order_by(CollaborationStepRecord.step_order).all()
+    return [status for status, in rows]
+
+
+async def create_plan(manager, db, agents, task_id, collaboration_type=CollaborationType.SEQUENTIAL):
+    return await manager.create_collaboration_plan(
+        task_id,
+        "Build the react component and the backend api endpoint",
+        collaboration_type,
+        agents,
+        db,
+    )
+
+
+async def test_completed_steps_only_update_their_own_collaboration(db, agents):
+    manager = CollaborationManager(FakeAgentManager(agents), boss_ai=None)
+    executed = await create_plan(manager, db, agents, "task-1")
+    untouched = await create_plan(manager, db, agents, "task-2")
+
+    await manager.execute_collaboration(executed.id, db)
+
+    assert step_statuses(db, executed.id) == ["completed", "completed"]
+    assert step_statuses(db, untouched.id) == ["pending", "pending"]
+
+
+async def test_failed_step_only_updates_its_own_collaboration(db, agents):
+    healthy = CollaborationManager(FakeAgentManager(agents), boss_ai=None)
+    untouched = await create_plan(healthy, db, agents, "task-1")
+
+    failing_agents = [FakeAgent("frontend", "frontend_developer", fail=True), agents[1]]
+    failing = CollaborationManager(FakeAgentManager(failing_agents), boss_ai=None)
+    executed = await create_plan(failing, db, failing_agents, "task-2")
+
+    with pytest.raises(RuntimeError):
+        await failing.execute_collaboration(executed.id, db)
+
+    assert step_statuses(db, executed.id) == ["failed", "pending"]
+    assert step_statuses(db, untouched.id) == ["pending", "pending"]
+
+
+def test_efficiency_is_accumulated_per_day(db, agents):
+    manager = CollaborationManager(FakeAgentManager(agents), boss_ai=None)
+
+    manager._record_collaboration_efficiency(80.0, db)
+    manager._record_collaboration_efficiency(120.0, db)
+    db.commit()
+
+    today = db.query(CollaborationEfficiency).one()
+    assert (today.efficiency_sum, today.sample_count) == (200.0, 2)
+    assert manager._calculate_efficiency_trends(db, datetime.utcnow() - timedelta(days=1)) == {
+        "avg_efficiency": 100.0,
+        "efficiency_trend": 0,
+    }
+
+
+def test_efficiency_trends_only_read_days_in_the_window(db, agents):
+    manager = CollaborationManager(FakeAgentManager(agents), boss_ai=None)
+    today = datetime.utcnow().date()
+    db.add_all([
+        CollaborationEfficiency(day=today - timedelta(days=40), efficiency_sum=10.0, sample_count=1),
+        CollaborationEfficiency(day=today - timedelta(days=10), efficiency_sum=60.0, sample_count=1),
+        CollaborationEfficiency(day=today, efficiency_sum=180.0, sample_count=2),
+    ])
+    db.commit()
+
+    trends = manager._calculate_efficiency_trends(db, datetime.utcnow() - timedelta(days=30))
+
+    assert trends == {"avg_efficiency": 80.0, "efficiency_trend": 30.0}
+
+
+async def test_migration_keeps_text_agents_involved_rows_readable(engine, agents):
+    legacy = create_legacy_tables(engine)
+    with engine.begin() as connection:
+        connection.execute(legacy.tables["task_collaborations"].insert().values(
+            id="legacy",
+            primary_task_id="task-0",
+            collaboration_type="sequential",
+            agents_involved='["frontend"]',
+            created_at=datetime.utcnow(),
+        ))
+
+    migrate_collaboration_tables(engine)
+    migrate_collaboration_tables(engine)  # Running it again is a no-op
+
+    db = sessionmaker(bind=engine)()
+    manager = CollaborationManager(FakeAgentManager(agents), boss_ai=None)
+    await create_plan(manager, db, agents, "task-1")
+
+    participation = manager._get_agent_participation(db, datetime.utcnow() - timedelta(days=1))
+    assert participation == {"frontend": 2, "backend": 1}
+    status = await manager.get_collaboration_status("legacy", db)
+    assert status["agents_involved"] == ["frontend"]
+    db.close()
+
+
+async def test_migration_adds_nanosecond_step_timestamps(engine, agents):
+    create_legacy_tables(engine)
+    migrate_collaboration_tables(engine)
+
+    db = sessionmaker(bind=engine)()
+    manager = CollaborationManager(FakeAgentManager(agents), boss_ai=None)
+    plan = await create_plan(manager, db, agents, "task-1")
+    await manager.execute_collaboration(plan.id, db)
+
+    timestamps = db.query(
+        CollaborationStepRecord.started_at_ns, CollaborationStepRecord.completed_at_ns
+    ).filter(CollaborationStepRecord.collaboration_id == plan.id).all()
+    assert len(timestamps) == 2
+    assert all(started <= completed for started, completed in timestamps)
+    db.close()
+
+
+async def test_parallel_steps_overlap_and_integration_waits_for_them(db):
+    events = []
+    agents = [
+        RecordingAgent("frontend", "frontend_developer", events),
+        RecordingAgent("backend", "backend_developer", events),
+    ]
+    manager = CollaborationManager(FakeAgentManager(agents), boss_ai=None)
+    plan = await create_plan(manager, db, agents, "task-1", CollaborationType.PARALLEL)
+
+    await manager.execute_collaboration(plan.id, db)
+
+    # Both independent steps start before either finishes, and the
+    # integration step only starts once they have both ended
+    assert [kind for kind, _ in events] == ["start", "start", "end", "end", "start", "end"]
+    assert events[4][1].startswith("Integrate")
+    assert step_statuses(db, plan.id) == ["completed"] * 3
+
+
+async def test_iterative_rounds_run_one_after_another(db):
+    events = []
+    agents = [
+        RecordingAgent("frontend", "frontend_developer", events),
+        RecordingAgent("backend", "backend_developer", events),
+    ]
+    manager = CollaborationManager(FakeAgentManager(agents), boss_ai=None)
+    plan = await create_plan(manager, db, agents, "task-1", CollaborationType.ITERATIVE)
+
+    await manager.execute_collaboration(plan.id, db)
+
+    def positions(kind, iteration):
+        return [
+            position for position, (event_kind, step) in enumerate(events)
+            if event_kind == kind and step.startswith(f"Iteration {iteration}:")
+        ]
+
+    assert len(positions("end", 1)) == len(positions("start", 2)) == 2
+    assert max(positions("end", 1)) < min(positions("start", 2))
+    assert step_statuses(db, plan.id) == ["completed"] * 4
@@ -0,0 +1,132 @@
+# Analytics service unit tests
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from backend.services import analytics
+from backend.services.analytics import AnalyticsService, TimeRange, _TTLCache
+
+
+class FakeSessionFactory:
+    """Stands in for async_sessionmaker, tracking which sessions are open"""
+
+    def __init__(self):
+        self.opened = []
+        self.open = set()
+
+    @asynccontextmanager
+    async def __call__(self):
+        session = object()
+        self.opened.append(session)
+        self.open.add(session)
+        try:
+            yield session
+        finally:
+            self.open.discard(session)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(analytics.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_ttl_cache_expires_entries(clock):
+    cache = _TTLCache(maxsize=4, ttl=10)
+    cache["a"] = 1
+
+    clock[0] += 9
+    assert cache.get("a") == 1
+
+    clock[0] += 1
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_evicts_least_recently_used(clock):
+    cache = _TTLCache(maxsize=2, ttl=10)
+    cache["a"] = 1
+    cache["b"] = 2
+    cache.get("a")  # "b" becomes least recently used
+    cache["c"] = 3
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+async def test_concurrent_misses_share_one_computation_in_its_own_session():
+    sessions = FakeSessionFactory()
+    service = AnalyticsService(session_factory=sessions)
+    release = asyncio.Event()
+    calls = []
+
+    async def compute(db, time_range):
+        calls.append(db)
+        assert db in sessions.open
+        await release.wait()
+        return f"analytics for {time_range.value}"
+
+    service._compute_team_analytics = compute
+    caller_session = object()
+
+    waiters = [
+        asyncio.ensure_future(service.get_team_analytics(caller_session, TimeRange.WEEK))
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters)
+
+    assert results == ["analytics for 7d"] * 3
+    assert calls == sessions.opened  # one computation, never on the caller's session
+    assert len(calls) == 1
+    assert not sessions.open
+
+    # Served from the cache afterwards
+    assert await service.get_team_analytics(caller_session, TimeRange.WEEK) == "analytics for 7d"
+    assert len(calls) == 1
+
+
+async def test_cancelling_the_first_caller_does_not_fail_the_others():
+    sessions = FakeSessionFactory()
+    service = AnalyticsService(session_factory=sessions)
+    release = asyncio.Event()
+
+    async def compute(db, time_range):
+        await release.wait()
+        assert db in sessions.open
+        return "dashboard"
+
+    service._compute_metrics_dashboard = compute
+
+    first = asyncio.ensure_future(service.get_metrics_dashboard(object(), TimeRange.DAY))
+    second = asyncio.ensure_future(service.get_metrics_dashboard(object(), TimeRange.DAY))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    release.set()
+
+    assert await second == "dashboard"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert not service._inflight
+
+
+async def test_failed_computation_is_not_cached():
+    service = AnalyticsService(session_factory=FakeSessionFactory())
+    outcomes = [ValueError("Project p1 not found"), "project"]
+
+    async def compute(db, project_id):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    service._compute_project_analytics = compute
+
+    with pytest.raises(ValueError):
+        await service.get_project_analytics(object(), "p1")
+    assert await service.get_project_analytics(object(), "p1") == "project"
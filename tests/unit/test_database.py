@@ -1 +1,57 @@
-# Database unit tests - TBD
\ No newline at end of file
+# Database unit tests
+import pytest
+from sqlalchemy import create_engine, text
+
+from backend import database
+from backend.database import SHARED_MEMORY_DATABASE_URL, get_async_database_url
+
+
+@pytest.mark.parametrize("database_url, expected", [
+    ("sqlite:///./virtuai_office.db", "sqlite+aiosqlite:///./virtuai_office.db"),
+    ("sqlite+pysqlite:///data/app.db", "sqlite+aiosqlite:///data/app.db"),
+    ("postgresql://user@db:5432/virtuai", "postgresql+asyncpg://user@db:5432/virtuai"),
+    ("postgres://user@db/virtuai", "postgresql+asyncpg://user@db/virtuai"),
+    ("postgresql+psycopg2://user@db/virtuai", "postgresql+asyncpg://user@db/virtuai"),
+    ("postgresql+asyncpg://user@db/virtuai", "postgresql+asyncpg://user@db/virtuai"),
+    ("postgresql://user@db/virtuai?sslmode=require", "postgresql+asyncpg://user@db/virtuai?ssl=require"),
+])
+def test_async_database_url_uses_async_driver(database_url, expected):
+    assert get_async_database_url(database_url).render_as_string(hide_password=False) == expected
+
+
+def test_async_database_url_rejects_backend_without_async_driver():
+    with pytest.raises(ValueError, match="mysql"):
+        get_async_database_url("mysql://user@db/virtuai")
+
+
+@pytest.fixture
+def async_database(monkeypatch):
+    """Point the lazily created async session factory at a given URL"""
+    monkeypatch.setattr(database, "_async_session_factory", None)
+
+    def use(database_url):
+        monkeypatch.setattr(database, "DATABASE_URL", database_url)
+
+    yield use
+    if database._async_session_factory is not None:
+        database._async_session_factory.kw["bind"].sync_engine.dispose()
+
+
+def test_async_engine_is_only_required_when_used(async_database):
+    async_database("mysql://user@db/virtuai")
+
+    with pytest.raises(ValueError, match="mysql"):
+        database.get_async_session_factory()
+
+
+async def test_async_sessions_share_the_in_memory_database(async_database):
+    async_database(SHARED_MEMORY_DATABASE_URL)
+    sync_engine = create_engine(SHARED_MEMORY_DATABASE_URL)
+    with sync_engine.begin() as connection:
+        connection.execute(text("CREATE TABLE shared_check (value INTEGER)"))
+        connection.execute(text("INSERT INTO shared_check VALUES (42)"))
+
+    async with database.get_async_session_factory()() as session:
+        assert (await session.execute(text("SELECT value FROM shared_check"))).scalar() == 42
+
+    sync_engine.dispose()
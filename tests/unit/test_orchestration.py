@@ -1 +1,117 @@
-# Orchestration unit tests - TBD
\ No newline at end of file
+# Orchestration unit tests
+import asyncio
+
+import pytest
+
+from backend.models.database import AgentType
+from backend.orchestration.scheduler import TaskExecutionState, TaskScheduler
+from backend.orchestration.workflow import (
+    ParallelStepGroup,
+    StepStatus,
+    WorkflowDefinition,
+    WorkflowEngine,
+    WorkflowExecution,
+    WorkflowStep,
+)
+
+
+class FakeAgent:
+    def __init__(self, agent_id, agent_type, handler):
+        self.id = agent_id
+        self.type = agent_type
+        self.handler = handler
+
+    async def process_task(self, task):
+        return await self.handler(self, task)
+
+
+class FakeAgentManager:
+    def __init__(self, agents):
+        self.agents = agents
+
+    async def get_agents_by_type(self, agent_type):
+        return [agent for agent in self.agents if agent.type == agent_type]
+
+
+def make_step(step_id, agent_type):
+    return WorkflowStep(
+        id=step_id,
+        name=step_id,
+        agent_type=agent_type,
+        task_description=f"Run {step_id}",
+        retry_count=0,
+    )
+
+
+def make_engine(handler, agent_types):
+    agents = [FakeAgent(f"{agent_type}-1", agent_type, handler) for agent_type in agent_types]
+    return WorkflowEngine(FakeAgentManager(agents), task_processor=None)
+
+
+async def test_wait_for_all_group_runs_steps_concurrently():
+    started = []
+    both_started = asyncio.Event()
+
+    async def handler(agent, task):
+        started.append(agent.id)
+        if len(started) == 2:
+            both_started.set()
+        # Only returns if the other step is running at the same time
+        await asyncio.wait_for(both_started.wait(), timeout=1)
+        return f"{agent.id} done"
+
+    steps = [make_step("design", "ui_ux_designer"), make_step("api", "backend_developer")]
+    workflow = WorkflowDefinition(id="wf", name="wf", description="", steps=steps)
+    execution = WorkflowExecution(id="exec", workflow_id="wf")
+    engine = make_engine(handler, ["ui_ux_designer", "backend_developer"])
+
+    await engine._execute_parallel_group(ParallelStepGroup(steps), execution, workflow)
+
+    assert [step.status for step in steps] == [StepStatus.COMPLETED, StepStatus.COMPLETED]
+    assert execution.completed_steps == {"design", "api"}
+
+
+async def test_wait_for_all_group_records_failures_without_raising():
+    async def handler(agent, task):
+        if agent.type == "backend_developer":
+            raise RuntimeError("api failed")
+        return "design done"
+
+    steps = [make_step("design", "ui_ux_designer"), make_step("api", "backend_developer")]
+    workflow = WorkflowDefinition(id="wf", name="wf", description="", steps=steps)
+    execution = WorkflowExecution(id="exec", workflow_id="wf")
+    engine = make_engine(handler, ["ui_ux_designer", "backend_developer"])
+
+    await engine._execute_parallel_group(ParallelStepGroup(steps), execution, workflow)
+
+    assert steps[0].status == StepStatus.COMPLETED
+    assert steps[1].status == StepStatus.FAILED
+    assert execution.failed_steps == {"api"}
+
+
+async def test_unregistering_an_agent_mid_task_still_records_the_outcome():
+    scheduler = TaskScheduler(scheduler_interval=60)
+    scheduler._loop = asyncio.get_running_loop()
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def runner(metadata):
+        started.set()
+        await release.wait()
+        return "done"
+
+    scheduler.register_agent("a1", AgentType.BACKEND_DEVELOPER, runner=runner)
+    await scheduler.schedule_task("t1")
+    await scheduler._schedule_pending_tasks()
+    await started.wait()
+
+    scheduler.unregister_agent("a1")
+    await asyncio.sleep(0)  # Lets the reassignment requeue the task
+    release.set()
+    await asyncio.sleep(0.01)
+
+    task = scheduler.completed_tasks["t1"]
+    assert (task.state, task.result) == (TaskExecutionState.COMPLETED, "done")
+    assert not scheduler.queued_index and not scheduler.task_queue
+    assert "a1" not in scheduler._available_agents
+    scheduler.executor.shutdown()
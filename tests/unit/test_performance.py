@@ -1 +1,83 @@
-# Performance unit tests - TBD
\ No newline at end of file
+# Performance unit tests
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.models.database import Base, Task, TaskStatus
+from backend.orchestration.performance import PerformanceAnalyzer, PerformanceCollector
+
+proc_only = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc")
+
+
+@pytest.fixture
+def collector():
+    collector = PerformanceCollector()
+    yield collector
+    collector.close()
+
+
+@proc_only
+def test_concurrent_samples_share_the_proc_files_safely(collector):
+    memory_total = collector._sample_system()[3]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        samples = list(pool.map(lambda _: collector._sample_system(), range(400)))
+
+    assert all(sample[3] == memory_total for sample in samples)
+    assert all(0.0 <= sample[0] <= 100.0 for sample in samples)
+    assert collector._proc_fds is not None  # Never fell back to psutil
+
+
+@proc_only
+def test_close_releases_the_proc_files(collector):
+    fds = list(collector._proc_fds.values())
+
+    collector.close()
+
+    for fd in fds:
+        with pytest.raises(OSError):
+            os.fstat(fd)
+    # Sampling keeps working through psutil
+    assert collector.sample_system()[3] > 0
+
+
+@proc_only
+async def test_restarting_collection_reopens_the_proc_files(collector):
+    await collector.start_collection()
+    await collector.stop_collection()
+    assert collector._proc_fds is None
+
+    await collector.start_collection()
+    assert collector._proc_fds is not None
+    await collector.stop_collection()
+
+
+def test_agent_analysis_only_uses_the_reported_week(collector):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    now = datetime.utcnow()
+    for seconds in (20, 40):
+        db.add(Task(
+            title="t", description="d", agent_id="a1", status=TaskStatus.COMPLETED,
+            started_at=now - timedelta(seconds=seconds), completed_at=now
+        ))
+    db.commit()
+
+    analyzer = PerformanceAnalyzer(collector)
+    # A benchmark outside the task history must not leak into the weekly figures
+    finish = analyzer.benchmark_agent("a1", "t0", "llama", "simple")
+    finish()
+
+    analysis = analyzer.analyze_agent_performance("a1", db)
+
+    assert analysis["period"] == "last_7_days"
+    assert analysis["total_tasks"] == 2
+    assert analysis["avg_completion_time"] == pytest.approx(30.0)
+    db.close()
+    engine.dispose()